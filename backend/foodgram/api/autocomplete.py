@@ -0,0 +1,109 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from hashlib import md5
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from recipes.models import Ingredient
+
+from .cache import bump_version, get_version
+
+logger = logging.getLogger(__name__)
+
+MAX_CHAR = chr(0x10FFFF)
+INGREDIENT_INDEX_VERSION_KEY = 'api:ingredients:version'
+
+
+class IngredientIndex:
+    """Отсортированный индекс ингредиентов в памяти процесса.
+
+    Хранит названия в casefold-регистре и отвечает на запросы по
+    префиксу двоичным поиском, не обращаясь к базе данных.
+
+    Процессы узнают об изменении ингредиентов по версии в кеше и
+    перечитывают индекс, поэтому выдача и ETag у всех воркеров
+    совпадают. Правки в обход ORM подхватываются по
+    INGREDIENT_INDEX_TTL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+        self._version = None
+        self._loaded_at = 0
+
+    def load(self):
+        version = get_version(INGREDIENT_INDEX_VERSION_KEY)
+        rows = Ingredient.objects.values_list(
+            'id', 'name', 'measurement_unit', 'updated'
+        )
+        entries = sorted(
+            (name.casefold(), pk, name, unit, updated)
+            for pk, name, unit, updated in rows
+        )
+        keys = [entry[0] for entry in entries]
+        items = [
+            {'id': pk, 'name': name, 'measurement_unit': unit}
+            for _, pk, name, unit, _ in entries
+        ]
+        digest = md5(
+            repr([entry[1:4] for entry in entries]).encode()
+        ).hexdigest()
+        last_modified = max(
+            (entry[4] for entry in entries), default=None
+        )
+        state = keys, items, digest, last_modified
+        with self._lock:
+            self._state = state
+            self._version = version
+            self._loaded_at = time.monotonic()
+        return state
+
+    def warm(self):
+        try:
+            self.load()
+        except DatabaseError:
+            logger.warning('Не удалось загрузить индекс ингредиентов.')
+
+    def invalidate(self):
+        """Сбрасывает индекс во всех процессах после фиксации транзакции."""
+        transaction.on_commit(
+            lambda: bump_version(INGREDIENT_INDEX_VERSION_KEY)
+        )
+
+    def _snapshot(self):
+        with self._lock:
+            state = self._state
+            stale = (
+                self._version != get_version(INGREDIENT_INDEX_VERSION_KEY)
+                or time.monotonic() - self._loaded_at
+                > settings.INGREDIENT_INDEX_TTL
+            )
+        if state is None or stale:
+            return self.load()
+        return state
+
+    def validators(self):
+        """Хеш содержимого индекса и время последнего изменения."""
+        _, _, digest, last_modified = self._snapshot()
+        return digest, last_modified
+
+    def search(self, query='', limit=None):
+        """Ингредиенты, начинающиеся с query, затем содержащие query."""
+        keys, items, _, _ = self._snapshot()
+        query = query.casefold()
+        start = bisect_left(keys, query)
+        end = bisect_left(keys, query + MAX_CHAR, start)
+        result = items[start:end]
+        if query and (limit is None or len(result) < limit):
+            result += [
+                item for key, item in zip(keys, items)
+                if query in key and not key.startswith(query)
+            ]
+        return result[:limit]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,359 @@
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Favorite, Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import Subscription
+
+User = get_user_model()
+
+BENCH_EMAIL_DOMAIN = 'bench.foodgram.local'
+SEED_PREFIX = 'seed-'
+SEED_TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+    ('Десерт', '#F5C542', 'dessert'),
+    ('Выпечка', '#A0522D', 'bakery'),
+    ('На скорую руку', '#1E90FF', 'quick'),
+)
+SEED_PERIOD = timedelta(days=730)
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    index = max(0, round(percent / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def get_bench_user(name='bench', **extra):
+    user, _ = User.objects.get_or_create(
+        email=f'{name}@{BENCH_EMAIL_DOMAIN}',
+        defaults={
+            'username': name,
+            'first_name': name,
+            'last_name': name,
+            **extra,
+        },
+    )
+    return user
+
+
+def seed_recipes(count, batch_size=5000, stdout=None):
+    """Дозаполняет таблицу рецептов до count записей."""
+    author = get_bench_user()
+    words = list(
+        Ingredient.objects.values_list('name', flat=True)[:500]
+    ) or ['рецепт']
+    start = Recipe.objects.count()
+    for offset in range(start, count, batch_size):
+        Recipe.objects.bulk_create(
+            Recipe(
+                name=f'{words[i % len(words)]} {i}',
+                author=author,
+                image='recipes/images/bench.png',
+                text=f'Описание рецепта {i}',
+                cooking_time=i % 120 + 1,
+            )
+            for i in range(offset, min(offset + batch_size, count))
+        )
+        if stdout:
+            stdout.write(f'Рецептов: {min(offset + batch_size, count)}')
+
+
+def seed_favorites(count, batch_size=5000, stdout=None):
+    """Дозаполняет избранное до count записей.
+
+    Каждый тестовый пользователь добавляет в избранное все рецепты по
+    порядку, пользователи создаются по мере необходимости.
+    """
+    recipes = list(Recipe.objects.order_by('id').values_list('id', flat=True))
+    if not recipes:
+        return
+    start = Favorite.objects.count()
+    for offset in range(start, count, batch_size):
+        stop = min(offset + batch_size, count)
+        users = {
+            index: get_bench_user(f'bench-fan-{index}').id
+            for index in range(offset // len(recipes),
+                               (stop - 1) // len(recipes) + 1)
+        }
+        Favorite.objects.bulk_create(
+            (
+                Favorite(
+                    user_id=users[i // len(recipes)],
+                    recipe_id=recipes[i % len(recipes)],
+                )
+                for i in range(offset, stop)
+            ),
+            ignore_conflicts=True,
+        )
+        if stdout:
+            stdout.write(f'Избранного: {stop}')
+
+
+def seed_recipe_tags(tag_count, stdout=None):
+    """Создаёт tag_count тегов и раздаёт их тестовым рецептам без тегов.
+
+    Рецепт с id i получает теги, соответствующие единичным битам
+    i % 2 ** tag_count, поэтому все сочетания тегов встречаются
+    одинаково часто.
+    """
+    tags = [
+        Tag.objects.get_or_create(
+            slug=f'bench-{index}',
+            defaults={'name': f'bench-{index}', 'color': f'#{index:06x}'},
+        )[0].id
+        for index in range(tag_count)
+    ]
+    RecipeTags = Recipe.tags.through
+    recipes = Recipe.objects.filter(
+        author=get_bench_user(), tags__isnull=True
+    ).values_list('id', flat=True)
+    links = [
+        RecipeTags(recipe_id=recipe, tag_id=tag)
+        for recipe in recipes.iterator()
+        for bit, tag in enumerate(tags)
+        if recipe % 2 ** tag_count >> bit & 1
+    ]
+    RecipeTags.objects.bulk_create(links, ignore_conflicts=True)
+    if stdout:
+        stdout.write(f'Связей рецептов и тегов добавлено: {len(links)}')
+    return [f'bench-{index}' for index in range(tag_count)]
+
+
+def measure_queryset(stdout, label, queryset, repeat=20, page_size=6):
+    """Замеряет count() и первую страницу выборки, как при пагинации."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        queryset.count()
+        list(queryset[:page_size])
+        timings.append((time.perf_counter() - started) * 1000)
+    stdout.write(
+        f'{label}: p50={percentile(timings, 50):.1f} мс, '
+        f'p95={percentile(timings, 95):.1f} мс'
+    )
+    return timings
+
+
+class EndpointBenchmark:
+    """Замеряет время ответа и число запросов к БД для эндпоинтов."""
+
+    def __init__(self, stdout, repeat=50, user=None):
+        self.stdout = stdout
+        self.repeat = repeat
+        self.client = Client()
+        if user is not None:
+            token, _ = Token.objects.get_or_create(user=user)
+            self.client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+            self.client.force_login(user)
+
+    def run(self, label, url):
+        timings = []
+        queries = []
+        for _ in range(self.repeat):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = self.client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+        self.stdout.write(
+            f'{label}: HTTP {response.status_code}, '
+            f'p50={percentile(timings, 50):.1f} мс, '
+            f'p95={percentile(timings, 95):.1f} мс, '
+            f'p99={percentile(timings, 99):.1f} мс, '
+            f'запросов={statistics.median(queries):g}'
+        )
+        return timings, queries
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Разрешает задавать значения полям с auto_now_add при bulk_create."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class DatasetSeeder:
+    """Синтетический набор данных для замеров.
+
+    Пользователи, рецепты, избранное, корзины и подписки дозаполняются
+    до заданных размеров пачками bulk_create. Популярность неравномерна:
+    небольшая доля авторов, рецептов и ингредиентов получает большую
+    часть подписок, добавлений в избранное и упоминаний в рецептах.
+    Счётчики и производные таблицы после вставки нужно пересчитать
+    командами rebuild_*.
+    """
+
+    def __init__(self, stdout, batch_size=5000, seed=0):
+        self.stdout = stdout
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self.now = timezone.now()
+
+    def skewed(self, items, power=3):
+        """Случайный элемент items, первые выпадают заметно чаще."""
+        return items[int(len(items) * self.random.random() ** power)]
+
+    def moment(self):
+        return self.now - SEED_PERIOD * self.random.random()
+
+    def report(self, label, done, started):
+        elapsed = max(time.monotonic() - started, 0.001)
+        self.stdout.write(f'{label}: {done}, {done / elapsed:.0f} строк/с')
+
+    def batches(self, start, count):
+        for offset in range(start, count, self.batch_size):
+            yield range(offset, min(offset + self.batch_size, count))
+
+    def users(self):
+        return User.objects.filter(
+            username__startswith=SEED_PREFIX,
+            email__endswith=f'@{BENCH_EMAIL_DOMAIN}',
+        )
+
+    def seed_tags(self):
+        return [
+            Tag.objects.get_or_create(
+                slug=slug, defaults={'name': name, 'color': color}
+            )[0].id
+            for name, color, slug in SEED_TAGS
+        ]
+
+    def seed_ingredients(self, count=2000):
+        if not Ingredient.objects.exists():
+            Ingredient.objects.bulk_create(
+                Ingredient(name=f'ингредиент {i}', measurement_unit='г')
+                for i in range(count)
+            )
+        return list(Ingredient.objects.order_by('id').values_list(
+            'id', flat=True
+        ))
+
+    def seed_users(self, count):
+        password = make_password(None)
+        started = time.monotonic()
+        for batch in self.batches(self.users().count(), count):
+            User.objects.bulk_create(
+                User(
+                    email=f'{SEED_PREFIX}{i}@{BENCH_EMAIL_DOMAIN}',
+                    username=f'{SEED_PREFIX}{i}',
+                    first_name=f'Имя {i}',
+                    last_name=f'Фамилия {i}',
+                    password=password,
+                )
+                for i in batch
+            )
+            self.report('Пользователей', batch.stop, started)
+        return list(self.users().order_by('id').values_list('id', flat=True))
+
+    def seed_recipes(self, count, users, tags, ingredients):
+        words = list(
+            Ingredient.objects.values_list('name', flat=True)[:500]
+        ) or ['рецепт']
+        recipes = Recipe.objects.filter(author__in=self.users())
+        started = time.monotonic()
+        RecipeTags = Recipe.tags.through
+        for batch in self.batches(recipes.count(), count):
+            names = {
+                i: f'{self.random.choice(words)} №{i}' for i in batch
+            }
+            with explicit_dates(Recipe._meta.get_field('pub_date')):
+                Recipe.objects.bulk_create(
+                    Recipe(
+                        name=names[i],
+                        author_id=self.skewed(users, 2),
+                        image='recipes/images/bench.png',
+                        text=f'Описание рецепта {names[i]}',
+                        cooking_time=self.random.randint(5, 180),
+                        pub_date=self.moment(),
+                    )
+                    for i in batch
+                )
+            ids = Recipe.objects.filter(
+                name__in=names.values()
+            ).values_list('id', flat=True)
+            links = []
+            recipe_ingredients = []
+            for recipe in ids:
+                for tag in self.random.sample(
+                    tags, self.random.randint(1, 3)
+                ):
+                    links.append(RecipeTags(recipe_id=recipe, tag_id=tag))
+                chosen = {
+                    self.skewed(ingredients, 2)
+                    for _ in range(self.random.randint(3, 12))
+                }
+                recipe_ingredients.extend(
+                    RecipeIngredient(
+                        recipe_id=recipe,
+                        ingredient_id=ingredient,
+                        amount=self.random.randint(1, 500),
+                    )
+                    for ingredient in chosen
+                )
+            RecipeTags.objects.bulk_create(links)
+            RecipeIngredient.objects.bulk_create(recipe_ingredients)
+            self.report('Рецептов', batch.stop, started)
+        return list(recipes.order_by('id').values_list(
+            'id', flat=True
+        ))
+
+    def seed_pairs(self, model, count, users, recipes):
+        """Избранное или корзины: случайный пользователь, популярный рецепт.
+
+        Повторные пары отбрасываются, поэтому строк может оказаться
+        немного меньше count.
+        """
+        started = time.monotonic()
+        with explicit_dates(model._meta.get_field('created')):
+            for batch in self.batches(model.objects.count(), count):
+                model.objects.bulk_create(
+                    (
+                        model(
+                            user_id=self.random.choice(users),
+                            recipe_id=self.skewed(recipes),
+                            created=self.moment(),
+                        )
+                        for _ in batch
+                    ),
+                    ignore_conflicts=True,
+                )
+                self.report(model._meta.verbose_name_plural, batch.stop,
+                            started)
+
+    def seed_subscriptions(self, count, users):
+        started = time.monotonic()
+        for batch in self.batches(Subscription.objects.count(), count):
+            pairs = {
+                (self.random.choice(users), self.skewed(users, 2))
+                for _ in batch
+            }
+            Subscription.objects.bulk_create(
+                (
+                    Subscription(user_id=user, author_id=author)
+                    for user, author in pairs
+                    if user != author
+                ),
+                ignore_conflicts=True,
+            )
+            self.report('Подписок', batch.stop, started)
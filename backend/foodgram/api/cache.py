@@ -0,0 +1,132 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+from recipes.models import Recipe, Tag
+
+from .metrics import record_cache
+
+CATALOG_VERSION_KEY = 'api:catalog:version'
+RECIPE_LIST_VERSION_KEY = 'api:recipes:list:version'
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def recipe_list_key(request):
+    query = md5(
+        request.query_params.urlencode().encode()
+    ).hexdigest()
+    return (
+        f'api:recipes:list:{get_version(CATALOG_VERSION_KEY)}:'
+        f'{get_version(RECIPE_LIST_VERSION_KEY)}:{query}'
+    )
+
+
+def recipe_detail_key(recipe_id):
+    return (
+        f'api:recipes:detail:{get_version(CATALOG_VERSION_KEY)}:{recipe_id}'
+    )
+
+
+def recipe_validators_key(recipe_id):
+    return f'{recipe_detail_key(recipe_id)}:validators'
+
+
+def get_tag_ids():
+    """Соответствие slug -> id тегов до следующего изменения каталога."""
+    key = f'api:tags:{get_version(CATALOG_VERSION_KEY)}'
+    tag_ids = cache.get(key)
+    record_cache('tags', tag_ids is not None)
+    if tag_ids is None:
+        tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tag_ids, None)
+    return tag_ids
+
+
+def invalidate_recipes(recipe_ids):
+    """Сбрасывает кеш рецептов после фиксации транзакции."""
+    def invalidate():
+        cache.delete_many([
+            key for pk in recipe_ids
+            for key in (recipe_detail_key(pk), recipe_validators_key(pk))
+        ])
+        bump_version(RECIPE_LIST_VERSION_KEY)
+    transaction.on_commit(invalidate)
+
+
+def invalidate_author(author_id):
+    invalidate_recipes(list(
+        Recipe.objects.filter(author_id=author_id).values_list(
+            'id', flat=True
+        )
+    ))
+
+
+def invalidate_catalog():
+    transaction.on_commit(lambda: bump_version(CATALOG_VERSION_KEY))
+
+
+class AnonymousCacheMixin:
+    """Кеширует ответы list и retrieve для анонимных пользователей.
+
+    При попадании в кеш ответ отдаётся без обращений к ORM
+    и сериализаторам.
+    """
+
+    def cached_response(self, key, method, request, *args, **kwargs):
+        if not request.user.is_anonymous:
+            return method(request, *args, **kwargs)
+        data = cache.get(key)
+        record_cache('responses', data is not None)
+        if data is not None:
+            return Response(data)
+        response = method(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RECIPE_CACHE_TIMEOUT)
+        return response
+
+    def cached_validators(self, key, load, request):
+        """Валидаторы ETag анонимного ответа кешируются вместе с ним.
+
+        Поэтому попадание в кеш, в том числе ответ 304, обходится без
+        запросов к БД.
+        """
+        if not request.user.is_anonymous:
+            return load()
+        validators = cache.get(key)
+        record_cache('validators', validators is not None)
+        if validators is None:
+            validators = load()
+            if validators is not None:
+                cache.set(key, validators, settings.RECIPE_CACHE_TIMEOUT)
+        return validators
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            recipe_list_key(request), super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = str(kwargs[self.lookup_field])
+        if not pk.isdigit():
+            return super().retrieve(request, *args, **kwargs)
+        return self.cached_response(
+            recipe_detail_key(int(pk)),
+            super().retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,67 @@
+from calendar import timegm
+from hashlib import md5
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers, quote_etag)
+from django.utils.http import http_date
+
+
+def catalog_validators(queryset):
+    """Число записей и время последнего изменения справочника."""
+    state = queryset.aggregate(count=Count('id'), updated=Max('updated'))
+    return (state['count'], state['updated']), state['updated']
+
+
+class ConditionalGetMixin:
+    """Поддержка ETag / Last-Modified и ответов 304 для GET-запросов.
+
+    Наследник реализует get_validators(), возвращающий кортеж
+    (значения для ETag, дата изменения) или None.
+    """
+    conditional_actions = ('list', 'retrieve')
+
+    def get_validators(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    def get_cache_control(self, request):
+        return {'public': True, 'max_age': settings.CATALOG_MAX_AGE}
+
+    def dispatch_conditional(self, method, request, *args, **kwargs):
+        validators = self.get_validators(request, *args, **kwargs)
+        if validators is None:
+            return method(request, *args, **kwargs)
+        values, last_modified = validators
+        etag = quote_etag(md5(
+            repr((values, request.query_params.urlencode())).encode()
+        ).hexdigest())
+        timestamp = (
+            timegm(last_modified.utctimetuple()) if last_modified else None
+        )
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = method(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            patch_cache_control(response, **self.get_cache_control(request))
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if 'list' not in self.conditional_actions:
+            return super().list(request, *args, **kwargs)
+        return self.dispatch_conditional(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        if 'retrieve' not in self.conditional_actions:
+            return super().retrieve(request, *args, **kwargs)
+        return self.dispatch_conditional(
+            super().retrieve, request, *args, **kwargs
+        )
@@ -1,31 +1,141 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import (Case, Exists, F, FloatField, IntegerField,
+                              OuterRef, Q, Value, When)
 from django_filters.rest_framework import BooleanFilter, FilterSet, filters
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import SEARCH_CONFIG, Ingredient, Recipe
+
+from .cache import get_tag_ids
 
 
 class IngredientSearchFilter(FilterSet):
-    name = filters.CharFilter(lookup_expr='istartswith')
+    name = filters.CharFilter(method='filter_name')
 
     class Meta:
         model = Ingredient
         fields = ('name',)
 
+    def filter_name(self, queryset, name, value):
+        """Поиск по вхождению, совпадения по началу названия - первыми.
+
+        Выдача совпадает с индексом в памяти (api/autocomplete.py).
+        UPPER(name) LIKE '%...%' обслуживается GIN-индексом
+        recipes_ingredient_name_trgm_idx.
+        """
+        return queryset.filter(name__icontains=value).annotate(
+            is_prefix=Case(
+                When(name__istartswith=value, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        ).order_by('is_prefix', 'name')
+
+
+class RecipeOrderingFilter(filters.OrderingFilter):
+    """Сортировка с добавлением порядка ленты для равных значений.
+
+    Порядок совпадает с индексами recipe_favorites_count_idx и
+    recipe_score_idx. ?ordering=popular сортирует по убыванию
+    популярности.
+    """
+    descending = ('popular',)
+
+    def get_ordering_value(self, param):
+        value = super().get_ordering_value(param)
+        if param.lstrip('-') in self.descending:
+            return value[1:] if value.startswith('-') else f'-{value}'
+        return value
+
+    def filter(self, queryset, value):
+        queryset = super().filter(queryset, value)
+        if value:
+            queryset = queryset.order_by(
+                *queryset.query.order_by, '-pub_date', '-id'
+            )
+        return queryset
+
+
+def tag_choices():
+    return [(slug, slug) for slug in get_tag_ids()]
+
 
 class RecipeFilter(FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all()
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices,
+        method='filter_tags',
+    )
+    tags_mode = filters.ChoiceFilter(
+        choices=(('any', 'Любой из тегов'), ('all', 'Все теги')),
+        method='filter_tags_mode',
     )
     is_favorited = BooleanFilter(method='get_is_favorited')
     is_in_shopping_cart = BooleanFilter(
         method='get_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='filter_search')
+    ordering = RecipeOrderingFilter(
+        fields=(
+            ('pub_date', 'pub_date'),
+            ('favorites_count', 'favorites'),
+            ('shopping_cart_count', 'shopping_cart'),
+            ('score', 'popular'),
+        )
+    )
 
     class Meta:
         model = Recipe
         fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart',)
 
+    def filter_tags(self, queryset, name, value):
+        """Рецепты с любым из тегов или, при ?tags_mode=all, со всеми.
+
+        Slug переводятся в id по кешу тегов, а фильтр строится через
+        EXISTS к связи рецептов и тегов (в режиме all - по одному на
+        тег), поэтому соединения с тегами и DISTINCT в основном запросе
+        нет.
+        """
+        tag_ids = get_tag_ids()
+        ids = {tag_ids[slug] for slug in value if slug in tag_ids}
+        links = Recipe.tags.through.objects.filter(recipe_id=OuterRef('pk'))
+        if self.form.cleaned_data.get('tags_mode') == 'all':
+            groups = [[tag_id] for tag_id in sorted(ids)]
+        else:
+            groups = [ids]
+        for index, group in enumerate(groups):
+            alias = f'has_tags_{index}'
+            queryset = queryset.annotate(**{
+                alias: Exists(links.filter(tag_id__in=group))
+            }).filter(**{alias: True})
+        return queryset
+
+    def filter_tags_mode(self, queryset, name, value):
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию и описанию.
+
+        В PostgreSQL используется search_vector с GIN-индексом, на
+        остальных СУБД - поиск подстроки, где совпадения в названии
+        выше совпадений в описании.
+        """
+        if connections[queryset.db].vendor == 'postgresql':
+            query = SearchQuery(value, config=SEARCH_CONFIG)
+            queryset = queryset.filter(search_vector=query).annotate(
+                rank=SearchRank(F('search_vector'), query)
+            )
+        else:
+            queryset = queryset.filter(
+                Q(name__icontains=value) | Q(text__icontains=value)
+            ).annotate(
+                rank=Case(
+                    When(name__icontains=value, then=Value(1.0)),
+                    default=Value(0.5),
+                    output_field=FloatField(),
+                )
+            )
+        return queryset.order_by('-rank', '-pub_date', '-id')
+
     def get_is_favorited(self, queryset, name, value):
         if self.request.user.is_authenticated:
             return queryset.filter(favorites__user=self.request.user)
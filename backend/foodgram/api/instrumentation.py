@@ -0,0 +1,153 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+current_stats = ContextVar('request_stats', default=None)
+
+NUMBERS = re.compile(r'\b\d+\b')
+PARAMETER_LISTS = re.compile(r'\((?:%s|\?|N)(?:,\s*(?:%s|\?|N))*\)')
+
+
+def query_shape(sql):
+    """Текст запроса без значений: числа и списки параметров свёрнуты."""
+    return PARAMETER_LISTS.sub('(...)', NUMBERS.sub('N', sql))
+
+
+class RequestStats:
+    """Запросы к БД и время сериализации в рамках одного HTTP-запроса.
+
+    Экземпляр подключается к соединениям через execute_wrapper.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            self.db_time += duration
+            self.queries.append((sql, duration))
+
+    @property
+    def elapsed(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def repeated_queries(self, threshold):
+        """Формы запросов, выполненные не меньше threshold раз."""
+        shapes = Counter(query_shape(sql) for sql, _ in self.queries)
+        return [
+            (shape, count) for shape, count in shapes.most_common()
+            if count >= threshold
+        ]
+
+    def slowest_queries(self, limit):
+        return sorted(self.queries, key=lambda query: -query[1])[:limit]
+
+
+class SerializerTimingMixin:
+    """Учитывает время сериализации в статистике текущего запроса.
+
+    Время вложенных сериализаторов входит во время внешнего и повторно
+    не суммируется.
+    """
+
+    def to_representation(self, instance):
+        stats = current_stats.get()
+        if stats is None or stats.serializing:
+            return super().to_representation(instance)
+        stats.serializing = True
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            stats.serializing = False
+            stats.serializer_time += (time.perf_counter() - started) * 1000
+
+
+class InstrumentationMiddleware:
+    """Число и время запросов к БД, время сериализации и размер ответа.
+
+    Значения передаются в заголовке Server-Timing и пишутся в лог.
+    Запросы дольше SLOW_REQUEST_MS логируются вместе с самыми долгими
+    SQL-запросами, а запросы одной формы, повторённые не меньше
+    N_PLUS_ONE_THRESHOLD раз, - как возможная проблема N+1.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        elapsed = stats.elapsed
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={stats.db_time:.1f};desc="{len(stats.queries)} queries"',
+            f'serializer;dur={stats.serializer_time:.1f}',
+            f'total;dur={elapsed:.1f}',
+        ))
+        self.report(request, response, stats, elapsed)
+        return response
+
+    def report(self, request, response, stats, elapsed):
+        match = request.resolver_match
+        repeated = stats.repeated_queries(settings.N_PLUS_ONE_THRESHOLD)
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round(elapsed, 1),
+            'queries': len(stats.queries),
+            'db_ms': round(stats.db_time, 1),
+            'serializer_ms': round(stats.serializer_time, 1),
+            'size': None if response.streaming else len(response.content),
+            'repeated_queries': sum(count for _, count in repeated),
+        }
+        logger.info(
+            ' '.join(f'{name}={value}' for name, value in fields.items()),
+            extra={'request_stats': fields},
+        )
+        for shape, count in repeated:
+            logger.warning(
+                'Возможный N+1 в %s: %d одинаковых запросов: %s',
+                fields['view'], count, shape,
+                extra={'request_stats': fields},
+            )
+        if elapsed >= settings.SLOW_REQUEST_MS:
+            # Параметры не пишутся: среди них бывают токены и e-mail.
+            queries = '\n'.join(
+                f'{duration:.1f} мс: {sql}'
+                for sql, duration
+                in stats.slowest_queries(settings.SLOW_REQUEST_SQL_LIMIT)
+            )
+            logger.warning(
+                'Медленный запрос %s %s: %.0f мс, запросов к БД %d\n%s',
+                request.method, request.path, elapsed, len(stats.queries),
+                queries,
+                extra={'request_stats': fields},
+            )
@@ -0,0 +1,69 @@
+from django.core.management import BaseCommand, CommandError
+
+from api.benchmarks import SEED_TAGS, DatasetSeeder, EndpointBenchmark
+from recipes.models import Ingredient, Recipe
+
+ENDPOINTS = (
+    ('Рецепты', '/api/recipes/'),
+    ('Рецепты, страница 100', '/api/recipes/?page=100'),
+    ('Рецепты по тегам', '/api/recipes/?tags={tag}&tags={other_tag}'),
+    ('Рецепты по всем тегам',
+     '/api/recipes/?tags={tag}&tags={other_tag}&tags_mode=all'),
+    ('Рецепты автора', '/api/recipes/?author={author}'),
+    ('Популярные', '/api/recipes/?ordering=popular'),
+    ('Поиск', '/api/recipes/?search={word}'),
+    ('Рецепт', '/api/recipes/{recipe}/'),
+    ('Избранное', '/api/recipes/?is_favorited=1'),
+    ('Корзина', '/api/recipes/?is_in_shopping_cart=1'),
+    ('Подписки', '/api/users/subscriptions/?recipes_limit=3'),
+    ('Список покупок', '/api/recipes/download_shopping_cart/'),
+    ('Ингредиенты', '/api/ingredients/?name={prefix}'),
+)
+PRIVATE = ('Избранное', 'Корзина', 'Подписки', 'Список покупок')
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет p50/p95/p99 и число запросов к БД основных эндпоинтов '
+        'на данных, созданных командой seed_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument(
+            '--anonymous',
+            action='store_true',
+            help='Дополнительно замерить публичные эндпоинты без токена.',
+        )
+
+    def handle(self, *args, **options):
+        users = DatasetSeeder(self.stdout).users()
+        user = users.filter(
+            follower__isnull=False, shopping_cart__isnull=False
+        ).order_by('id').first()
+        recipe = Recipe.objects.filter(author__in=users).order_by(
+            '-score', 'id'
+        ).first()
+        if user is None or recipe is None:
+            raise CommandError('Нет тестовых данных, запустите seed_data.')
+        ingredient = Ingredient.objects.order_by('id').first()
+        params = {
+            'tag': SEED_TAGS[0][2],
+            'other_tag': SEED_TAGS[1][2],
+            'author': users.order_by('-recipes_count').first().id,
+            'word': recipe.name.split()[0],
+            'recipe': recipe.id,
+            'prefix': ingredient.name[:3],
+        }
+
+        self.stdout.write(f'Пользователь: {user.email}')
+        bench = EndpointBenchmark(self.stdout, options['repeat'], user)
+        for label, url in ENDPOINTS:
+            bench.run(label, url.format(**params))
+        if not options['anonymous']:
+            return
+        self.stdout.write('Без авторизации:')
+        bench = EndpointBenchmark(self.stdout, options['repeat'])
+        for label, url in ENDPOINTS:
+            if label not in PRIVATE:
+                bench.run(label, url.format(**params))
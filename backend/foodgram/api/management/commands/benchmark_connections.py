@@ -0,0 +1,81 @@
+import time
+
+from django.core.management import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from api.benchmarks import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает цикл запроса с новым соединением к БД и с сохранённым '
+        'соединением (CONN_MAX_AGE > 0).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=5,
+            help='Запросов к БД на один HTTP-запрос.',
+        )
+        parser.add_argument('--database', default='default')
+
+    def request_cycle(self, connection, queries):
+        """Сигналы начала и конца запроса вокруг queries запросов к БД.
+
+        Receiver-ы этих сигналов закрывают устаревшие соединения
+        и проверяют сохранённые, как при обработке настоящего запроса.
+        """
+        started = time.perf_counter()
+        request_started.send(sender=self.__class__)
+        with connection.cursor() as cursor:
+            for _ in range(queries):
+                cursor.execute('SELECT 1')
+        request_finished.send(sender=self.__class__)
+        return (time.perf_counter() - started) * 1000
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        settings_dict = connection.settings_dict
+        max_age = settings_dict['CONN_MAX_AGE']
+        pooled = settings_dict['ENGINE'] == 'foodgram.db_pool'
+        modes = (
+            ('Соединение из пула' if pooled else 'Новое соединение', 0),
+            ('Постоянное соединение', None),
+        )
+        opened = []
+        connection_created.connect(
+            lambda **kwargs: opened.append(1), weak=False,
+            dispatch_uid='benchmark_connections',
+        )
+        medians = []
+        try:
+            for label, age in modes:
+                connection.close()
+                settings_dict['CONN_MAX_AGE'] = age
+                opened.clear()
+                timings = [
+                    self.request_cycle(connection, options['queries'])
+                    for _ in range(options['repeat'])
+                ]
+                medians.append(percentile(timings, 50))
+                self.stdout.write(
+                    f'{label}: p50={percentile(timings, 50):.2f} мс, '
+                    f'p95={percentile(timings, 95):.2f} мс, '
+                    f'p99={percentile(timings, 99):.2f} мс, '
+                    f'подключений={len(opened)}'
+                )
+        finally:
+            connection_created.disconnect(
+                dispatch_uid='benchmark_connections'
+            )
+            settings_dict['CONN_MAX_AGE'] = max_age
+            connection.close()
+        self.stdout.write(
+            f'Накладные расходы на соединение: '
+            f'{medians[0] - medians[1]:.2f} мс на запрос (p50).'
+        )
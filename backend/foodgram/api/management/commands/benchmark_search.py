@@ -0,0 +1,76 @@
+from django.contrib.admin.sites import site
+from django.core.management import BaseCommand
+from django.db import connection
+
+from api.benchmarks import EndpointBenchmark, get_bench_user, seed_recipes
+from api.filters import IngredientSearchFilter
+from recipes.models import Ingredient, Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет поиск ингредиентов и рецептов по названию и выводит '
+        'планы запросов, которые выполняют эндпоинты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            default=0,
+            help=(
+                'Дозаполнить таблицу рецептов до указанного числа, '
+                'например 1000000. Рецепты создаются в настроенной БД '
+                'от имени пользователя bench.'
+            ),
+        )
+        parser.add_argument(
+            '--cleanup',
+            action='store_true',
+            help='Удалить рецепты пользователя bench после замера.',
+        )
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--query', default='абри')
+
+    def handle(self, *args, **options):
+        if options['recipes']:
+            seed_recipes(options['recipes'], stdout=self.stdout)
+        admin = get_bench_user('bench-admin', is_staff=True,
+                               is_superuser=True)
+        bench = EndpointBenchmark(self.stdout, options['repeat'], admin)
+        query = options['query']
+        try:
+            bench.run(
+                'Автодополнение ингредиентов',
+                f'/api/ingredients/?name={query}',
+            )
+            bench.run(
+                'Поиск рецептов в админке',
+                f'/admin/recipes/recipe/?q={query}',
+            )
+            # Те же выборки, что выполняют фильтр ингредиентов (без
+            # индекса в памяти) и поиск в админке.
+            self.explain(IngredientSearchFilter(
+                {'name': query}, queryset=Ingredient.objects.all()
+            ).qs)
+            self.explain(site._registry[Recipe].get_search_results(
+                None, Recipe.objects.all(), query
+            )[0])
+        finally:
+            if options['cleanup']:
+                deleted, _ = Recipe.objects.filter(
+                    author=get_bench_user()
+                ).delete()
+                self.stdout.write(f'Удалено объектов: {deleted}')
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        prefix = (
+            'EXPLAIN ANALYZE' if connection.vendor == 'postgresql'
+            else 'EXPLAIN QUERY PLAN'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            self.stdout.write('\n'.join(
+                str(row[-1]) for row in cursor.fetchall()
+            ))
@@ -0,0 +1,63 @@
+from django.core.management import BaseCommand
+
+from api.benchmarks import (EndpointBenchmark, get_bench_user,
+                            measure_queryset, seed_recipe_tags, seed_recipes)
+from api.filters import RecipeFilter
+from recipes.models import Recipe
+
+
+def join_filter(slugs, mode):
+    """Прежний фильтр: соединение с тегами и DISTINCT."""
+    queryset = Recipe.objects.all()
+    if mode == 'all':
+        for slug in slugs:
+            queryset = queryset.filter(tags__slug=slug)
+        return queryset.distinct()
+    return queryset.filter(tags__slug__in=slugs).distinct()
+
+
+def subquery_filter(slugs, mode):
+    """Текущий фильтр RecipeFilter.tags."""
+    return RecipeFilter(
+        {'tags': slugs, 'tags_mode': mode}, queryset=Recipe.objects.all()
+    ).qs
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает фильтрацию рецептов по нескольким тегам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100_000)
+        parser.add_argument('--tags', type=int, default=8)
+        parser.add_argument(
+            '--selected',
+            type=int,
+            nargs='+',
+            default=[1, 3, 8],
+            help='Сколько тегов выбирать в каждом замере.',
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        seed_recipes(options['recipes'], stdout=self.stdout)
+        slugs = seed_recipe_tags(options['tags'], stdout=self.stdout)
+        bench = EndpointBenchmark(
+            self.stdout, options['repeat'], get_bench_user()
+        )
+        for count in options['selected']:
+            selected = slugs[:count]
+            for mode in ('any', 'all'):
+                label = f'{count} тегов, {mode}'
+                for name, build in (('JOIN + DISTINCT', join_filter),
+                                    ('Подзапрос', subquery_filter)):
+                    measure_queryset(
+                        self.stdout,
+                        f'{name}, {label}',
+                        build(selected, mode).order_by('-pub_date', '-id'),
+                        options['repeat'],
+                    )
+                query = '&'.join(f'tags={slug}' for slug in selected)
+                bench.run(
+                    f'Эндпоинт, {label}',
+                    f'/api/recipes/?{query}&tags_mode={mode}',
+                )
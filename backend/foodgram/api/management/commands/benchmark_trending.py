@@ -0,0 +1,36 @@
+from django.core.management import BaseCommand
+
+from api.benchmarks import (EndpointBenchmark, get_bench_user, seed_favorites,
+                            seed_recipes)
+from recipes.ranking import rebuild_scores
+
+
+class Command(BaseCommand):
+    help = 'Замеряет сортировку по популярности при росте избранного.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100_000)
+        parser.add_argument(
+            '--favorites',
+            type=int,
+            nargs='+',
+            default=[10_000, 100_000, 1_000_000, 3_000_000],
+            help='Размеры таблицы избранного, для каждого - отдельный замер.',
+        )
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        seed_recipes(options['recipes'], stdout=self.stdout)
+        bench = EndpointBenchmark(
+            self.stdout, options['repeat'], get_bench_user()
+        )
+        for favorites in sorted(options['favorites']):
+            seed_favorites(favorites)
+            rebuild_scores()
+            self.stdout.write(f'Избранного: {favorites}')
+            bench.run('Популярные', '/api/recipes/trending/')
+            bench.run('Сортировка', '/api/recipes/?ordering=popular')
+            bench.run(
+                'Сортировка, страница 100',
+                '/api/recipes/?ordering=popular&page=100',
+            )
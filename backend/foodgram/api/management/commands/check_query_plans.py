@@ -0,0 +1,56 @@
+from django.core.management import BaseCommand, CommandError
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from api.benchmarks import get_bench_user
+from api.query_plans import check_endpoints, seed_plan_data, without_seqscan
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет планы запросов основных эндпоинтов и завершается '
+        'ошибкой при последовательном чтении больших таблиц. Полное '
+        'чтение справочников и подсчёты строк выводятся для сведения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Дозаполнить базу до указанного числа рецептов.',
+        )
+        parser.add_argument(
+            '--no-seqscan',
+            action='store_true',
+            help='Запретить PostgreSQL полный проход там, где есть индекс.',
+        )
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            seed_plan_data(options['seed'], stdout=self.stdout)
+        if not Recipe.objects.exists():
+            raise CommandError('Нет рецептов, запустите команду с --seed.')
+        user = get_bench_user('bench-reader')
+        token, _ = Token.objects.get_or_create(user=user)
+        client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        if options['no_seqscan']:
+            with without_seqscan():
+                reports = check_endpoints(client)
+        else:
+            reports = check_endpoints(client)
+        failures = []
+        for report in reports:
+            self.stdout.write(str(report))
+            if options['verbosity'] > 1:
+                for sql in report.queries:
+                    self.stdout.write(sql)
+            if report.status_code != 200 or report.scans:
+                failures.append(str(report))
+        if failures:
+            raise CommandError(
+                'Последовательное чтение таблиц:\n' + '\n'.join(failures)
+            )
+        self.stdout.write('Планы запросов в порядке.')
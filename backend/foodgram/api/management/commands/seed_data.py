@@ -0,0 +1,58 @@
+import time
+
+from django.core.management import BaseCommand, call_command
+
+from api.benchmarks import DatasetSeeder
+from recipes.models import Favorite, ShoppingCart
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, рецептами, '
+        'избранным, корзинами и подписками для нагрузочных замеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--recipes', type=int, default=1_000_000)
+        parser.add_argument('--favorites', type=int, default=10_000_000)
+        parser.add_argument('--carts', type=int, default=1_000_000)
+        parser.add_argument('--subscriptions', type=int, default=1_000_000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Начальное значение генератора случайных чисел.',
+        )
+        parser.add_argument(
+            '--timelines',
+            action='store_true',
+            help='Перестроить ленты подписок после заполнения.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        seeder = DatasetSeeder(
+            self.stdout, options['batch_size'], options['seed']
+        )
+        tags = seeder.seed_tags()
+        ingredients = seeder.seed_ingredients()
+        users = seeder.seed_users(options['users'])
+        recipes = seeder.seed_recipes(
+            options['recipes'], users, tags, ingredients
+        )
+        if recipes:
+            seeder.seed_pairs(Favorite, options['favorites'], users, recipes)
+            seeder.seed_pairs(ShoppingCart, options['carts'], users, recipes)
+        if len(users) > 1:
+            seeder.seed_subscriptions(options['subscriptions'], users)
+
+        call_command('rebuild_counters', stdout=self.stdout)
+        call_command('rebuild_recipe_scores', stdout=self.stdout)
+        call_command('rebuild_shopping_lists', stdout=self.stdout)
+        if options['timelines']:
+            call_command('rebuild_timelines', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.0f} с.'
+        ))
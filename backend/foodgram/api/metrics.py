@@ -0,0 +1,378 @@
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .instrumentation import current_stats
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+AGGREGATE_FILE = 'aggregate.json'
+
+
+class Registry:
+    """Метрики процесса в формате, пригодном для сохранения в JSON.
+
+    Если задан METRICS_MULTIPROC_DIR, каждый процесс не чаще раза
+    в METRICS_FLUSH_INTERVAL секунд сохраняет свои значения в файл
+    <pid>.json, а экспозиция суммирует файлы всех процессов. Gauge
+    получают метку pid и берутся только у живых процессов.
+
+    Файлы завершившихся процессов при сборе переносятся в
+    aggregate.json и удаляются, чтобы процесс, получивший тот же pid,
+    не затёр их счётчики. Gunicorn заранее переименовывает файл
+    завершившегося воркера в <pid>.<время>.dead.json (см. child_exit
+    в gunicorn.conf.py).
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.flushed = 0.0
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: {
+                    json.dumps(labels): value
+                    for labels, value in metric.values.items()
+                }
+                for name, metric in self.metrics.items()
+            }
+
+    def flush(self, force=False):
+        directory = settings.METRICS_MULTIPROC_DIR
+        now = time.monotonic()
+        if not directory or (
+            not force and now - self.flushed < settings.METRICS_FLUSH_INTERVAL
+        ):
+            return
+        self.flushed = now
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump(self.snapshot(), file)
+        os.replace(f'{path}.tmp', path)
+
+    def merge_snapshot(self, merged, snapshot, pid=None):
+        """Добавляет к merged значения из файла процесса pid.
+
+        Без pid (файл завершившегося процесса или aggregate.json)
+        значения gauge пропускаются.
+        """
+        for name, values in snapshot.items():
+            metric = self.metrics.get(name)
+            if metric is None:
+                continue
+            for labels, value in values.items():
+                labels = tuple(json.loads(labels))
+                if isinstance(metric, Gauge):
+                    if pid is not None:
+                        merged[name][labels + (pid,)] = value
+                else:
+                    merged[name][labels] = metric.merge(
+                        merged[name].get(labels), value
+                    )
+        return merged
+
+    def compact(self, directory):
+        """Переносит файлы завершившихся процессов в aggregate.json."""
+        aggregate_path = os.path.join(directory, AGGREGATE_FILE)
+        dead = [
+            path for path in glob.glob(os.path.join(directory, '*.json'))
+            if path != aggregate_path and process_pid(path) is None
+        ]
+        if not dead:
+            return
+        aggregate = self.merge_snapshot(
+            defaultdict(dict), read_snapshot(aggregate_path)
+        )
+        for path in dead:
+            self.merge_snapshot(aggregate, read_snapshot(path))
+        with open(f'{aggregate_path}.tmp', 'w') as file:
+            json.dump({
+                name: {
+                    json.dumps(labels): value
+                    for labels, value in values.items()
+                }
+                for name, values in aggregate.items()
+            }, file)
+        os.replace(f'{aggregate_path}.tmp', aggregate_path)
+        for path in dead:
+            os.remove(path)
+
+    def collect(self):
+        """Значения всех процессов: {имя: {метки: значение}}."""
+        directory = settings.METRICS_MULTIPROC_DIR
+        if not directory:
+            return {
+                name: {tuple(json.loads(labels)): value
+                       for labels, value in values.items()}
+                for name, values in self.snapshot().items()
+            }
+        self.flush(force=True)
+        merged = defaultdict(dict)
+        with directory_lock(directory):
+            self.compact(directory)
+            for path in glob.glob(os.path.join(directory, '*.json')):
+                self.merge_snapshot(
+                    merged, read_snapshot(path), process_pid(path)
+                )
+        return merged
+
+    def expose(self):
+        lines = []
+        collected = self.collect()
+        multiprocess = bool(settings.METRICS_MULTIPROC_DIR)
+        for name, metric in self.metrics.items():
+            labelnames = metric.labelnames
+            if multiprocess and isinstance(metric, Gauge):
+                labelnames += ('pid',)
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for labels, value in sorted(collected.get(name, {}).items()):
+                lines.extend(
+                    metric.samples(dict(zip(labelnames, labels)), value)
+                )
+        return '\n'.join(lines) + '\n'
+
+
+@contextmanager
+def directory_lock(directory):
+    """Блокировка каталога метрик между процессами на время сбора."""
+    with open(os.path.join(directory, 'lock'), 'a') as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def read_snapshot(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def process_pid(path):
+    """Pid живого процесса, которому принадлежит файл метрик, или None."""
+    name = os.path.basename(path)[:-len('.json')]
+    if not name.isdigit() or not pid_alive(int(name)):
+        return None
+    return name
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\')
+                         .replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels.items()
+    )
+    return f'{{{pairs}}}'
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(),
+                 registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.registry = registry or REGISTRY
+        self.registry.register(self)
+
+    def key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def merge(self, current, value):
+        return value if current is None else current + value
+
+    def samples(self, labels, value):
+        yield f'{self.name}{format_labels(labels)} {float(value)}'
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self.registry.lock:
+            self.values[self.key(labels)] = value
+
+
+class Histogram(Metric):
+    """Гистограмма: счётчики по корзинам, сумма и число наблюдений."""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=LATENCY_BUCKETS, registry=None):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            state = self.values.setdefault(
+                key, [0] * len(self.buckets) + [0, 0]
+            )
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def merge(self, current, value):
+        if current is None:
+            return list(value)
+        return [left + right for left, right in zip(current, value)]
+
+    def samples(self, labels, value):
+        cumulative = 0
+        for bound, count in zip(self.buckets, value):
+            cumulative += count
+            yield (f'{self.name}_bucket'
+                   f'{format_labels({**labels, "le": bound})} {cumulative}')
+        yield (f'{self.name}_bucket'
+               f'{format_labels({**labels, "le": "+Inf"})} {value[-1]}')
+        yield f'{self.name}_sum{format_labels(labels)} {float(value[-2])}'
+        yield f'{self.name}_count{format_labels(labels)} {value[-1]}'
+
+
+REGISTRY = Registry()
+
+REQUESTS = Counter(
+    'foodgram_http_requests_total',
+    'Число HTTP-запросов.',
+    ('view', 'method', 'status'),
+)
+LATENCY = Histogram(
+    'foodgram_http_request_duration_seconds',
+    'Время обработки HTTP-запроса.',
+    ('view', 'method'),
+)
+QUERIES = Histogram(
+    'foodgram_db_queries_per_request',
+    'Число запросов к БД на один HTTP-запрос.',
+    ('view',),
+    buckets=QUERY_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests_total',
+    'Обращения к кешу приложения.',
+    ('cache', 'result'),
+)
+BUSY = Counter(
+    'foodgram_worker_busy_seconds_total',
+    'Время, в течение которого процесс обрабатывал запросы. Скорость '
+    'роста, делённая на число потоков воркера, - его загрузка.',
+)
+
+DB_CONNECTIONS = Counter(
+    'foodgram_db_connections_total',
+    'Подключения к БД; с пулом - получения соединения из пула.',
+    ('alias',),
+)
+DB_POOL_IN_USE = Gauge(
+    'foodgram_db_pool_connections_in_use',
+    'Соединения из пула, занятые запросами.',
+    ('alias',),
+)
+
+
+def record_cache(name, hit):
+    CACHE_REQUESTS.inc(cache=name, result='hit' if hit else 'miss')
+
+
+class MetricsMiddleware:
+    """Число, время и запросы к БД по представлениям и методам.
+
+    Должен стоять после InstrumentationMiddleware, чтобы видеть
+    статистику запросов к БД.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            elapsed = time.perf_counter() - started
+            BUSY.inc(elapsed)
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        REQUESTS.inc(
+            view=view, method=request.method, status=response.status_code
+        )
+        LATENCY.observe(elapsed, view=view, method=request.method)
+        stats = current_stats.get()
+        if stats is not None:
+            QUERIES.observe(len(stats.queries), view=view)
+        REGISTRY.flush()
+        return response
+
+
+def metrics_allowed(request):
+    token = settings.METRICS_TOKEN
+    if token and request.META.get('HTTP_AUTHORIZATION') == f'Bearer {token}':
+        return True
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def metrics_view(request):
+    """Экспозиция метрик в текстовом формате Prometheus.
+
+    Доступна с адресов из METRICS_ALLOWED_IPS (по умолчанию только
+    локальных), а если задан METRICS_TOKEN - также с заголовком
+    Authorization: Bearer <токен>.
+    """
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(REGISTRY.expose(), content_type=CONTENT_TYPE)
@@ -1,6 +1,255 @@
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+from functools import partial, reduce
+from hashlib import md5
+from operator import or_
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from recipes.models import TimelineEntry
+
+from .metrics import record_cache
+
+
+class QueryCounter:
+    """Подсчёт строк выборки с кешем и оценкой планировщика PostgreSQL.
+
+    Если оценка планировщика не меньше estimate_threshold, возвращается
+    она. Иначе точный COUNT(*) кешируется на cache_timeout секунд по
+    тексту SQL-запроса, то есть с учётом всех фильтров.
+    Возвращает кортеж (число, приблизительное ли оно).
+    """
+
+    def __init__(self, cache_timeout=None, estimate_threshold=None):
+        self.cache_timeout = cache_timeout
+        self.estimate_threshold = estimate_threshold
+
+    def __call__(self, queryset):
+        # values('pk') убирает из подсчёта аннотации, не участвующие
+        # в фильтрах, например флаги is_favorited.
+        queryset = queryset.values('pk')
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            # Условие заведомо ложно, например после none(): запрос к
+            # БД не нужен, и SQL для ключа кеша не строится.
+            return 0, False
+        if self.estimate_threshold is not None:
+            estimate = self.estimate(queryset.db, sql, params)
+            if estimate is not None and estimate >= self.estimate_threshold:
+                return estimate, True
+        if not self.cache_timeout:
+            return queryset.count(), False
+        key = 'api:count:' + md5(f'{sql}{params}'.encode()).hexdigest()
+        count = cache.get(key)
+        record_cache('counts', count is not None)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.cache_timeout)
+        return count, False
+
+    @staticmethod
+    def estimate(db, sql, params):
+        connection = connections[db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+class CountingPaginator(Paginator):
+    """Paginator, считающий строки через QueryCounter.
+
+    При приблизительном count наличие следующей страницы определяется
+    по лишней строке выборки, а не по числу страниц.
+    """
+
+    def __init__(self, object_list, per_page, counter=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.counter = counter
+        self.approximate = False
+
+    @cached_property
+    def count(self):
+        if self.counter is None:
+            return super().count
+        count, self.approximate = self.counter(self.object_list)
+        return count
+
+    def validate_number(self, number):
+        if not self.approximate:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы должен быть числом.')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1.')
+        return number
+
+    def page(self, number):
+        self.count  # подсчёт заполняет self.approximate
+        if not self.approximate:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        items = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not items and number > 1:
+            raise EmptyPage('На этой странице нет результатов.')
+        page = self._get_page(items[:self.per_page], number, self)
+        has_next = len(items) > self.per_page
+        page.has_next = lambda: has_next
+        return page
 
 
 class CustomPagination(PageNumberPagination):
+    """Постраничный вывод по номеру страницы или по ключу.
+
+    Режим по ключу включается параметром ?pagination=cursor (или
+    наличием ?cursor=) для представлений с атрибутом keyset_ordering.
+    В этом режиме нет OFFSET, а count считается только по ?count=true.
+    Способ подсчёта задаётся атрибутами представления count_cache_timeout
+    и count_estimate_threshold (см. QueryCounter).
+    """
     page_size_query_param = 'limit'
     page_size = 6
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.counter = QueryCounter(
+            cache_timeout=getattr(view, 'count_cache_timeout', None),
+            estimate_threshold=getattr(view, 'count_estimate_threshold', None),
+        )
+        self.django_paginator_class = partial(
+            CountingPaginator, counter=self.counter
+        )
+        ordering = getattr(view, 'keyset_ordering', None)
+        self.keyset = ordering is not None and (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == 'cursor'
+        )
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.ordering = ordering
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip('-'))
+            for name in ordering
+        ]
+        self.count = (
+            self.counter(queryset)[0]
+            if request.query_params.get(self.count_query_param) == 'true'
+            else None
+        )
+        position = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param)
+        )
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+        page_size = self.get_page_size(request)
+        page = list(queryset.order_by(*ordering)[:page_size + 1])
+        self.has_next = len(page) > page_size
+        page = page[:page_size]
+        self.last = page[-1] if page else None
+        return page
+
+    def after(self, position):
+        """Условие "строго после position" для порядка keyset_ordering."""
+        conditions = []
+        for index, name in enumerate(self.ordering):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition = {
+                field.attname: value
+                for field, value in zip(self.fields[:index], position)
+            }
+            condition[f'{self.fields[index].attname}__{lookup}'] = (
+                position[index]
+            )
+            conditions.append(Q(**condition))
+        return reduce(or_, conditions)
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            values = json.loads(b64decode(cursor.encode()).decode())
+            position = [
+                field.to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (BinasciiError, UnicodeDecodeError, ValueError, TypeError,
+                ValidationError):
+            raise NotFound('Неверный курсор.')
+        if len(position) != len(self.fields) or None in position:
+            raise NotFound('Неверный курсор.')
+        return position
+
+    def encode_cursor(self, obj):
+        values = [field.value_to_string(obj) for field in self.fields]
+        return b64encode(json.dumps(values).encode()).decode()
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.mode_query_param
+        )
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.last)
+        )
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        ]))
+
+
+class TimelinePagination(CustomPagination):
+    """Постраничный вывод ленты подписок по ключу (pub_date, id).
+
+    Id рецептов страницы берутся из TimelineEntry, сами рецепты
+    загружаются из queryset по первичному ключу.
+    """
+
+    def paginate_timeline(self, queryset, request):
+        self.keyset = True
+        self.request = request
+        self.count = None
+        self.fields = [
+            queryset.model._meta.get_field(name) for name in ('pub_date', 'id')
+        ]
+        position = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param)
+        )
+        page_size = self.get_page_size(request)
+        ids = TimelineEntry.objects.read(request.user, page_size + 1, position)
+        self.has_next = len(ids) > page_size
+        recipes = queryset.in_bulk(ids[:page_size])
+        page = [recipes[pk] for pk in ids[:page_size] if pk in recipes]
+        self.last = page[-1] if page else None
+        return page
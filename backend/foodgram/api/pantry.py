@@ -0,0 +1,153 @@
+import heapq
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from recipes.models import RecipeIngredient
+
+from .cache import bump_version, get_version
+
+logger = logging.getLogger(__name__)
+
+PANTRY_VERSION_KEY = 'api:pantry:version'
+
+
+class PantryIndex:
+    """Обратный индекс ингредиент -> рецепты в памяти процесса.
+
+    Для каждого ингредиента хранится отсортированный массив id
+    рецептов, для каждого рецепта - массив его ингредиентов. Подбор
+    рецептов по имеющимся продуктам обходит только массивы выбранных
+    ингредиентов и не обращается к базе данных.
+
+    Изменения рецептов применяются точечно через refresh(). Другие
+    процессы узнают о них по версии в кеше и перечитывают индекс
+    целиком, а правки в обход API подхватываются по PANTRY_INDEX_TTL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+        self._version = None
+        self._loaded_at = 0
+
+    def load(self):
+        version = get_version(PANTRY_VERSION_KEY)
+        rows = RecipeIngredient.objects.order_by(
+            'ingredient_id', 'recipe_id'
+        ).values_list('ingredient_id', 'recipe_id')
+        postings = {}
+        recipes = {}
+        for ingredient, recipe in rows.iterator():
+            postings.setdefault(ingredient, array('q')).append(recipe)
+            recipes.setdefault(recipe, array('q')).append(ingredient)
+        state = postings, recipes
+        with self._lock:
+            self._state = state
+            self._version = version
+            self._loaded_at = time.monotonic()
+        return state
+
+    def warm(self):
+        try:
+            self.load()
+        except DatabaseError:
+            logger.warning('Не удалось загрузить индекс рецептов.')
+
+    def _snapshot(self):
+        with self._lock:
+            state = self._state
+            stale = (
+                self._version != get_version(PANTRY_VERSION_KEY)
+                or time.monotonic() - self._loaded_at
+                > settings.PANTRY_INDEX_TTL
+            )
+        if state is None or stale:
+            return self.load()
+        return state
+
+    def refresh(self, recipe_ids):
+        """Перечитывает ингредиенты рецептов recipe_ids.
+
+        Удалённые рецепты исчезают из индекса.
+        """
+        if self._state is None:
+            bump_version(PANTRY_VERSION_KEY)
+            return
+        current = {recipe: set() for recipe in recipe_ids}
+        for recipe, ingredient in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id'):
+            current[recipe].add(ingredient)
+        with self._lock:
+            if self._state is not None:
+                self._apply(current)
+            expected = self._version + 1 if self._version else None
+        bump_version(PANTRY_VERSION_KEY)
+        version = get_version(PANTRY_VERSION_KEY)
+        with self._lock:
+            if version == expected:
+                self._version = version
+            else:
+                self._state = None
+
+    def _apply(self, current):
+        # Массивы не изменяются на месте, а заменяются новыми, чтобы
+        # параллельный поиск не видел их в промежуточном состоянии.
+        postings, recipes = self._state
+        for recipe, ingredients in current.items():
+            previous = set(recipes.get(recipe, ()))
+            for ingredient in previous - ingredients:
+                posting = array('q', postings[ingredient])
+                del posting[bisect_left(posting, recipe)]
+                postings[ingredient] = posting
+            for ingredient in ingredients - previous:
+                posting = array('q', postings.get(ingredient, ()))
+                insort(posting, recipe)
+                postings[ingredient] = posting
+            if ingredients:
+                recipes[recipe] = array('q', sorted(ingredients))
+            else:
+                recipes.pop(recipe, None)
+
+    def schedule_refresh(self, recipe_ids):
+        """Обновляет индекс после фиксации транзакции."""
+        recipe_ids = list(recipe_ids)
+        transaction.on_commit(lambda: self.refresh(recipe_ids))
+
+    def search(self, ingredient_ids, limit, max_missing=None):
+        """Рецепты с наибольшей долей имеющихся ингредиентов.
+
+        Возвращает список (id рецепта, совпало, не хватает), не
+        длиннее limit. При заданном max_missing в выдачу попадают только
+        рецепты, которым не хватает не больше max_missing ингредиентов.
+        """
+        postings, recipes = self._snapshot()
+        matched = Counter()
+        for ingredient in set(ingredient_ids):
+            matched.update(postings.get(ingredient, ()))
+        candidates = (
+            (recipe, count, len(recipes.get(recipe, ())) - count)
+            for recipe, count in matched.items()
+        )
+        if max_missing is not None:
+            candidates = (
+                candidate for candidate in candidates
+                if candidate[2] <= max_missing
+            )
+        return heapq.nsmallest(
+            limit,
+            candidates,
+            key=lambda item: (
+                -item[1] / (item[1] + max(item[2], 0)), item[2], -item[0]
+            ),
+        )
+
+
+pantry_index = PantryIndex()
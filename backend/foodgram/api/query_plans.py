@@ -0,0 +1,165 @@
+import json
+import re
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import connection
+
+from recipes.models import Favorite, Recipe, ShoppingCart, ShoppingListItem
+from users.models import Subscription
+
+from .benchmarks import (get_bench_user, seed_favorites, seed_recipe_tags,
+                         seed_recipes)
+
+ENDPOINTS = (
+    ('Список рецептов', '/api/recipes/'),
+    ('Список рецептов по ключу', '/api/recipes/?pagination=cursor'),
+    ('Рецепты автора', '/api/recipes/?author={author}'),
+    ('Рецепты по тегам', '/api/recipes/?tags=bench-0&tags=bench-1'),
+    ('Рецепты со всеми тегами',
+     '/api/recipes/?tags=bench-0&tags=bench-1&tags_mode=all'),
+    ('Избранное', '/api/recipes/?is_favorited=1'),
+    ('Корзина', '/api/recipes/?is_in_shopping_cart=1'),
+    ('Рецепт', '/api/recipes/{recipe}/'),
+    ('Лента подписок', '/api/recipes/feed/'),
+    ('Популярные', '/api/recipes/trending/'),
+    ('Подписки', '/api/users/subscriptions/?recipes_limit=3'),
+    ('Список покупок', '/api/recipes/download_shopping_cart/'),
+)
+# Маленькие справочники, которые планировщик вправе читать целиком.
+SMALL_TABLES = {'recipes_tag', 'recipes_ingredient'}
+# Подсчёт строк для пагинации кешируется или оценивается планировщиком
+# (см. QueryCounter), и для неселективных фильтров полный проход
+# по таблице для него - верный план. Такие планы выводятся отдельно.
+COUNT = 'SELECT COUNT(*)'
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+
+
+def postgresql_scans(plan):
+    if plan.get('Node Type') == 'Seq Scan':
+        yield plan['Relation Name']
+    for child in plan.get('Plans', ()):
+        yield from postgresql_scans(child)
+
+
+def sequential_scans(sql, params):
+    """Таблицы, которые план запроса читает последовательно."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return set(postgresql_scans(plan[0]['Plan']))
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return {
+            match.group(1) for match in (
+                SQLITE_SCAN.match(row[-1]) for row in cursor.fetchall()
+            ) if match
+        }
+
+
+@contextmanager
+def without_seqscan():
+    """Запрещает PostgreSQL последовательное чтение, если есть индекс.
+
+    На маленькой тестовой базе полный проход дешевле любого индекса,
+    поэтому без этой настройки план не показывает, есть ли у запроса
+    индекс. С ней Seq Scan остаётся только там, где индекса нет.
+    """
+    if connection.vendor != 'postgresql':
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SET enable_seqscan = off')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('RESET enable_seqscan')
+
+
+class PlanReport:
+    """Последовательные чтения в запросах одного эндпоинта."""
+
+    def __init__(self, label, status_code):
+        self.label = label
+        self.status_code = status_code
+        self.queries = []
+        # Большие таблицы в выборках - ошибка, остальное - для сведения.
+        self.scans = set()
+        self.small_scans = set()
+        self.count_scans = set()
+
+    def add(self, sql, scans):
+        self.queries.append(sql)
+        if sql.startswith(COUNT):
+            self.count_scans |= scans
+        else:
+            self.scans |= scans - SMALL_TABLES
+            self.small_scans |= scans & SMALL_TABLES
+
+    def __str__(self):
+        if self.status_code != 200:
+            return f'{self.label}: HTTP {self.status_code}'
+        parts = [f'запросов {len(self.queries)}']
+        for title, scans in (
+            ('чтение', self.scans),
+            ('справочники', self.small_scans),
+            ('подсчёт', self.count_scans),
+        ):
+            if scans:
+                parts.append(f'{title}: {", ".join(sorted(scans))}')
+        if not self.scans:
+            parts.append('ok')
+        return f'{self.label}: {"; ".join(parts)}'
+
+
+def check_endpoint(client, label, url):
+    """Выполняет запрос к url и проверяет планы его выборок."""
+    queries = []
+
+    def capture(execute, sql, params, many, context):
+        queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    cache.clear()
+    with connection.execute_wrapper(capture):
+        response = client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+    report = PlanReport(label, response.status_code)
+    tables = set(connection.introspection.table_names())
+    for sql, params in queries:
+        if sql.startswith('SELECT'):
+            report.add(sql, sequential_scans(sql, params) & tables)
+    return report
+
+
+def check_endpoints(client):
+    """Отчёты по всем ENDPOINTS для последнего рецепта в базе."""
+    recipe = Recipe.objects.order_by('-pub_date', '-id').first()
+    return [
+        check_endpoint(
+            client, label,
+            url.format(author=recipe.author_id, recipe=recipe.id),
+        )
+        for label, url in ENDPOINTS
+    ]
+
+
+def seed_plan_data(count, stdout=None):
+    """Данные, на которых эндпоинты из ENDPOINTS что-то возвращают."""
+    seed_recipes(count, stdout=stdout)
+    seed_recipe_tags(4, stdout=stdout)
+    seed_favorites(count * 3, stdout=stdout)
+    user = get_bench_user('bench-reader')
+    author = get_bench_user()
+    Subscription.objects.get_or_create(user=user, author=author)
+    for recipe in Recipe.objects.filter(author=author)[:5]:
+        Favorite.objects.get_or_create(user=user, recipe=recipe)
+        ShoppingCart.objects.get_or_create(user=user, recipe=recipe)
+    ShoppingListItem.objects.refresh(
+        [user.id], ShoppingListItem.objects.values('ingredient_id')
+    )
+    return user
@@ -0,0 +1,111 @@
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+CHUNK_ROWS = 500
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Базовый рендерер списка покупок.
+
+    Сам список отдаётся потоком через stream(), render() используется
+    только для ответов с ошибками.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False)
+
+    def stream(self, rows):
+        chunk = [self.header()]
+        for row in rows:
+            chunk.append(self.format_row(row))
+            if len(chunk) >= CHUNK_ROWS:
+                yield ''.join(chunk)
+                chunk = []
+        chunk.append(self.footer())
+        yield ''.join(chunk)
+
+    def header(self):
+        return ''
+
+    def footer(self):
+        return ''
+
+    def format_row(self, row):
+        raise NotImplementedError
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    """Список покупок в текстовом виде."""
+    media_type = 'text/plain'
+    format = 'txt'
+    pattern = (
+        '* Наименование: {name}, Ед. изм.:{measurement_unit}, '
+        'Кол-во: {amount}\n'
+    )
+
+    def format_row(self, row):
+        return self.pattern.format(**row)
+
+
+class Echo:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    """Список покупок в формате CSV."""
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def __init__(self):
+        self.writer = csv.writer(Echo())
+
+    def header(self):
+        return self.writer.writerow(
+            ('Наименование', 'Ед. изм.', 'Кол-во')
+        )
+
+    def format_row(self, row):
+        return self.writer.writerow(
+            (row['name'], row['measurement_unit'], row['amount'])
+        )
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    """Список покупок в формате JSON."""
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, rows):
+        self.separator = ''
+        return super().stream(rows)
+
+    def header(self):
+        return '['
+
+    def footer(self):
+        return ']'
+
+    def format_row(self, row):
+        item = self.separator + json.dumps(
+            {
+                'name': row['name'],
+                'measurement_unit': row['measurement_unit'],
+                'amount': row['amount'],
+            },
+            ensure_ascii=False,
+        )
+        self.separator = ','
+        return item
+
+
+SHOPPING_LIST_RENDERERS = (
+    ShoppingListTextRenderer,
+    ShoppingListCSVRenderer,
+    ShoppingListJSONRenderer,
+)
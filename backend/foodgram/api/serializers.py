@@ -1,17 +1,39 @@
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from django.db import transaction
+from django.db.models import prefetch_related_objects
 from djoser.serializers import UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
+from recipes.images import (IMAGE_FORMATS, IMAGE_VARIANTS,
+                            schedule_image_processing,
+                            schedule_variants_deletion, variant_name)
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            RecipeTag, ShoppingCart, Tag)
+                            ShoppingCart, ShoppingListItem, Tag)
 from users.models import Subscription
 
+from .instrumentation import SerializerTimingMixin
+from .pantry import pantry_index
+
 User = get_user_model()
 
 
-class CustomUserSerializer(UserSerializer):
+def get_subscribed_ids(request):
+    """Множество id авторов, на которых подписан пользователь запроса.
+
+    Загружается одним запросом и кешируется на объекте запроса.
+    """
+    if request is None or request.user.is_anonymous:
+        return frozenset()
+    if not hasattr(request, '_subscribed_ids'):
+        request._subscribed_ids = frozenset(
+            request.user.follower.values_list('author_id', flat=True)
+        )
+    return request._subscribed_ids
+
+
+class CustomUserSerializer(SerializerTimingMixin, UserSerializer):
     """Сериализатор пользователя."""
     is_subscribed = serializers.SerializerMethodField(read_only=True)
 
@@ -27,17 +49,11 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        return (
-            request
-            and not request.user.is_anonymous
-            and request.user.follower.filter(
-                author=obj
-            ).exists()
-        )
+        return obj.id in get_subscribed_ids(self.context.get('request'))
 
 
-class SubscriptionSerializer(serializers.ModelSerializer):
+class SubscriptionSerializer(SerializerTimingMixin,
+                             serializers.ModelSerializer):
     """Сериализатор подписок."""
     is_subscribed = serializers.SerializerMethodField(read_only=True)
     recipes = serializers.SerializerMethodField()
@@ -69,22 +85,22 @@ class SubscriptionSerializer(serializers.ModelSerializer):
 
     def get_is_subscribed(self, obj):
         request = self.context.get('request')
-        return (
-            request
-            and not request.user.is_anonymous
-            and Subscription.objects.filter(
-                user=request.user, author=obj.author
-            ).exists()
-        )
+        if request is not None and obj.user_id == request.user.id:
+            return True
+        return obj.author_id in get_subscribed_ids(request)
 
     def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj.author).count()
+        return obj.author.recipes_count
 
     def get_recipes(self, obj):
-        recipes = Recipe.objects.filter(author=obj.author)
         recipes_limit = self.context.get('recipes_limit')
-        if recipes_limit:
-            recipes = recipes[:int(recipes_limit)]
+        recipes_by_author = self.context.get('recipes_by_author')
+        if recipes_by_author is not None:
+            recipes = recipes_by_author.get(obj.author_id, [])
+        else:
+            recipes = Recipe.objects.latest_by_author(
+                [obj.author_id], recipes_limit
+            ).get(obj.author_id, [])
         serializer = ShortRecipeSerializer(
             recipes,
             many=True,
@@ -93,7 +109,7 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         return serializer.data
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     """Сериализатор тегов."""
     class Meta:
         model = Tag
@@ -105,7 +121,8 @@ class TagSerializer(serializers.ModelSerializer):
         ]
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(SerializerTimingMixin,
+                           serializers.ModelSerializer):
     """Сериализатор ингридиентов."""
     class Meta:
         model = Ingredient
@@ -144,11 +161,33 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         return serializer.data
 
 
-class ShortRecipeSerializer(serializers.ModelSerializer):
+class ImageVariantsMixin(serializers.Serializer):
+    """Ссылки на уменьшенные копии картинки рецепта."""
+    image_variants = serializers.SerializerMethodField(read_only=True)
+
+    def get_image_variants(self, obj):
+        if not obj.image_variants_ready:
+            return None
+        request = self.context.get('request')
+        variants = {}
+        for variant in IMAGE_VARIANTS:
+            variants[variant] = {}
+            for extension in IMAGE_FORMATS:
+                url = default_storage.url(
+                    variant_name(obj.image.name, variant, extension)
+                )
+                variants[variant][extension] = (
+                    request.build_absolute_uri(url) if request else url
+                )
+        return variants
+
+
+class ShortRecipeSerializer(SerializerTimingMixin, ImageVariantsMixin,
+                            serializers.ModelSerializer):
     """Сериализатор карточки рецепта."""
     class Meta:
         model = Recipe
-        fields = ['id', 'name', 'image', 'cooking_time']
+        fields = ['id', 'name', 'image', 'image_variants', 'cooking_time']
 
 
 class RecipeIngredientsSerializer(serializers.ModelSerializer):
@@ -174,7 +213,8 @@ class AddRecipeIngredientsSerializer(serializers.ModelSerializer):
         fields = ['id', 'amount']
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(SerializerTimingMixin, ImageVariantsMixin,
+                       serializers.ModelSerializer):
     """Сериализатор рецептов."""
     tags = TagSerializer(many=True, read_only=True)
     author = CustomUserSerializer(read_only=True)
@@ -190,7 +230,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart',
-                  'name', 'image', 'text', 'cooking_time',
+                  'name', 'image', 'image_variants', 'text',
+                  'cooking_time',
                   )
 
     def get_ingredients(self, obj):
@@ -198,6 +239,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         return RecipeIngredientsSerializer(ingredients, many=True).data
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         return (
             request
@@ -208,6 +251,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         return (
             request
@@ -223,9 +268,10 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     author = CustomUserSerializer(read_only=True)
     image = Base64ImageField()
     ingredients = AddRecipeIngredientsSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(queryset=Tag.objects.all(),
-                                              many=True,
-                                              required=True)
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=True,
+    )
 
     class Meta:
         model = Recipe
@@ -251,6 +297,66 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         ]
         RecipeIngredient.objects.bulk_create(recipe_ingredients)
 
+    @staticmethod
+    def create_tags(tags, recipe):
+        RecipeTags = Recipe.tags.through
+        RecipeTags.objects.bulk_create(
+            RecipeTags(recipe=recipe, tag_id=tag) for tag in tags
+        )
+
+    @staticmethod
+    def update_ingredients(ingredients, recipe):
+        """Применяет к рецепту только изменившиеся ингредиенты.
+
+        Возвращает id ингредиентов, которые были добавлены, удалены
+        или изменили количество.
+        """
+        current = {
+            item.ingredient_id: item
+            for item in recipe.recipe_ingredients.all()
+        }
+        new = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        removed = current.keys() - new.keys()
+        changed = [
+            item for ingredient_id, item in current.items()
+            if ingredient_id in new and item.amount != new[ingredient_id]
+        ]
+        for item in changed:
+            item.amount = new[item.ingredient_id]
+        if removed:
+            RecipeIngredient.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        RecipeCreateSerializer.create_ingredients(
+            [
+                ingredient for ingredient in ingredients
+                if ingredient['id'] not in current
+            ],
+            recipe,
+        )
+        return (
+            removed
+            | (new.keys() - current.keys())
+            | {item.ingredient_id for item in changed}
+        )
+
+    @staticmethod
+    def update_tags(tags, recipe):
+        current = {tag.id for tag in recipe.tags.all()}
+        removed = current - set(tags)
+        if removed:
+            Recipe.tags.through.objects.filter(
+                recipe=recipe, tag_id__in=removed
+            ).delete()
+        RecipeCreateSerializer.create_tags(
+            [tag for tag in tags if tag not in current], recipe
+        )
+
     def validate_ingredients(self, ingredients):
         uniq_ingredients = set()
 
@@ -269,8 +375,28 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError(
                     'Количество ингредиента должно быть не больше 32767'
                 )
+        missing = uniq_ingredients - set(
+            Ingredient.objects.filter(
+                id__in=uniq_ingredients
+            ).values_list('id', flat=True)
+        )
+        if missing:
+            raise serializers.ValidationError(
+                f'Ингредиенты не найдены: {sorted(missing)}'
+            )
         return ingredients
 
+    def validate_tags(self, tags):
+        tags = list(dict.fromkeys(tags))
+        missing = set(tags) - set(
+            Tag.objects.filter(id__in=tags).values_list('id', flat=True)
+        )
+        if missing:
+            raise serializers.ValidationError(
+                f'Теги не найдены: {sorted(missing)}'
+            )
+        return tags
+
     def validate_cooking_time(self, cooking_time):
         if cooking_time < 0:
             raise serializers.ValidationError('Укажите время готовки!')
@@ -284,28 +410,42 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             **validated_data,
             author=self.context['request'].user,
         )
-        recipe.tags.set(tags)
+        self.create_tags(tags, recipe)
         self.create_ingredients(ingredients, recipe)
+        schedule_image_processing(recipe)
+        pantry_index.schedule_refresh([recipe.id])
         return recipe
 
     @transaction.atomic
     def update(self, obj, validated_data):
-        ingredients = validated_data.pop('ingredients')
-        tags = validated_data.pop('tags')
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
         recipe = obj
-        RecipeIngredient.objects.filter(recipe=recipe).delete()
-        for ingredient in ingredients:
-            RecipeIngredient.objects.create(
-                recipe=recipe,
-                ingredient_id=ingredient['id'],
-                amount=ingredient['amount'],
-            )
-        RecipeTag.objects.filter(recipe=recipe).delete()
-        for tag in tags:
-            RecipeTag.objects.create(recipe=recipe, tag=tag)
-        super().update(recipe, validated_data)
+        if tags is not None:
+            self.update_tags(tags, recipe)
+        if ingredients is not None:
+            changed = self.update_ingredients(ingredients, recipe)
+            if changed:
+                # bulk_create и bulk_update не отправляют сигналы.
+                ShoppingListItem.objects.schedule_refresh(
+                    recipe.shopping_cart.values_list('user_id', flat=True),
+                    changed,
+                )
+                pantry_index.schedule_refresh([recipe.id])
+        if 'image' in validated_data:
+            validated_data['image_variants_ready'] = False
+            schedule_variants_deletion(recipe.image.name)
+            schedule_image_processing(recipe)
+        # Сохраняются только изменённые поля, чтобы не затереть счётчики,
+        # обновлённые параллельными запросами.
+        for attr, value in validated_data.items():
+            setattr(recipe, attr, value)
+        recipe.save(update_fields=[*validated_data, 'updated'])
         return recipe
 
     def to_representation(self, obj):
+        prefetch_related_objects(
+            [obj], 'tags', 'recipe_ingredients__ingredient'
+        )
         serializer = RecipeSerializer(obj, context=self.context)
         return serializer.data
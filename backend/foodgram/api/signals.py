@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, RecipeTag, Tag
+from recipes.signals import ingredients_imported
+
+from .autocomplete import ingredient_index
+from .cache import invalidate_author, invalidate_catalog, invalidate_recipes
+from .metrics import DB_CONNECTIONS
+from .pantry import pantry_index
+
+User = get_user_model()
+
+
+@receiver(ingredients_imported)
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver(ingredients_imported)
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_catalog_cache(**kwargs):
+    invalidate_catalog()
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def invalidate_recipe_cache(instance, **kwargs):
+    invalidate_recipes([instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_from_pantry_index(instance, **kwargs):
+    pantry_index.schedule_refresh([instance.pk])
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+@receiver((post_save, post_delete), sender=RecipeTag)
+def invalidate_recipe_relation_cache(instance, **kwargs):
+    invalidate_recipes([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags_cache(instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        invalidate_recipes(list(pk_set or ()))
+    else:
+        invalidate_recipes([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_cache(instance, update_fields, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_author(instance.pk)
+
+
+@receiver(request_started)
+def check_persistent_connections(**kwargs):
+    """Закрывает сохранённые соединения, которые перестали отвечать.
+
+    Аналог CONN_HEALTH_CHECKS из Django 4.1. Выполняется после
+    close_old_connections, поэтому проверяются только соединения,
+    которые будут использованы повторно.
+    """
+    if not settings.DB_CONN_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
+
+
+@receiver(connection_created)
+def count_connection(connection, **kwargs):
+    DB_CONNECTIONS.inc(alias=connection.alias)
@@ -0,0 +1,37 @@
+from django.core.cache import cache
+from django.test import TransactionTestCase
+
+from recipes.models import Ingredient
+
+from ..autocomplete import IngredientIndex
+
+
+class IngredientIndexInvalidationTest(TransactionTestCase):
+    """Изменение ингредиента сбрасывает индекс во всех процессах."""
+
+    def setUp(self):
+        cache.clear()
+        self.ingredient = Ingredient.objects.create(
+            name='Мука', measurement_unit='г'
+        )
+        # Отдельный экземпляр индекса - как в другом воркере.
+        self.index = IngredientIndex()
+
+    def test_change_reloads_index(self):
+        etag = self.index.validators()
+        self.assertEqual(
+            [item['name'] for item in self.index.search('му')], ['Мука']
+        )
+        self.ingredient.name = 'Мускатный орех'
+        self.ingredient.save()
+        self.assertEqual(
+            [item['name'] for item in self.index.search('му')],
+            ['Мускатный орех'],
+        )
+        self.assertNotEqual(self.index.validators(), etag)
+
+    def test_validators_match_across_processes(self):
+        other = IngredientIndex()
+        self.index.load()
+        Ingredient.objects.create(name='Сахар', measurement_unit='г')
+        self.assertEqual(self.index.validators(), other.validators())
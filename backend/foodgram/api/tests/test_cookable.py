@@ -0,0 +1,93 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, RecipeIngredient
+
+from ..pantry import pantry_index
+from .utils import create_recipe, create_user
+
+
+class CookableTest(APITestCase):
+    """Подбор рецептов по имеющимся ингредиентам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {i}',
+                                      measurement_unit='г')
+            for i in range(5)
+        ]
+        cls.recipes = {}
+        for name, indexes in (
+            ('full', (0, 1)),
+            ('partial', (0, 1, 2)),
+            ('other', (2, 3)),
+            ('single', (4,)),
+        ):
+            recipe = create_recipe(author, name)
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe,
+                                 ingredient=cls.ingredients[index], amount=1)
+                for index in indexes
+            )
+            cls.recipes[name] = recipe
+
+    def setUp(self):
+        cache.clear()
+        pantry_index.load()
+
+    def ids(self, *indexes):
+        return ','.join(str(self.ingredients[index].id) for index in indexes)
+
+    def get(self, query):
+        response = self.client.get(f'/api/recipes/cookable/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [
+            (item['name'], item['matched_ingredients'],
+             item['missing_ingredients'])
+            for item in response.data
+        ]
+
+    def test_ranking(self):
+        self.assertEqual(
+            self.get(f'ingredients={self.ids(0, 1)}'),
+            [('full', 2, 0), ('partial', 2, 1)],
+        )
+        self.assertEqual(
+            self.get(f'ingredients={self.ids(0, 1, 2)}'),
+            [('partial', 3, 0), ('full', 2, 0), ('other', 1, 1)],
+        )
+
+    def test_max_missing_and_limit(self):
+        query = f'ingredients={self.ids(0, 2)}'
+        self.assertEqual(
+            self.get(f'{query}&max_missing=1'),
+            [('partial', 2, 1), ('other', 1, 1), ('full', 1, 1)],
+        )
+        self.assertEqual(self.get(f'{query}&max_missing=0'), [])
+        self.assertEqual(len(self.get(f'{query}&limit=1')), 1)
+
+    def test_invalid_params(self):
+        for query in (
+            '',
+            'ingredients=abc',
+            f'ingredients={self.ids(0)}&limit=-1',
+            f'ingredients={self.ids(0)}&max_missing=x',
+        ):
+            with self.subTest(query):
+                response = self.client.get(f'/api/recipes/cookable/?{query}')
+                self.assertEqual(response.status_code, 400)
+
+    def test_refresh(self):
+        single = self.recipes['single']
+        RecipeIngredient.objects.create(
+            recipe=single, ingredient=self.ingredients[0], amount=1
+        )
+        pantry_index.refresh([single.id])
+        self.assertIn(
+            ('single', 1, 1), self.get(f'ingredients={self.ids(0)}')
+        )
+        single.delete()
+        pantry_index.refresh([single.id])
+        self.assertEqual(self.get(f'ingredients={self.ids(4)}'), [])
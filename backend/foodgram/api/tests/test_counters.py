@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.contrib.admin.sites import site
+from django.core.management import call_command
+from django.test import RequestFactory
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from recipes.models import NO_SCORE, Favorite, Recipe
+from users.models import Subscription, User
+
+
+class DenormalizedCountersTest(APITestCase):
+    """Счётчики не теряют обновления F() при полном save()."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            email='author@foodgram.local', username='author',
+            first_name='Имя', last_name='Фамилия', password='password-123',
+        )
+        self.reader = User.objects.create_user(
+            email='reader@foodgram.local', username='reader',
+            first_name='Имя', last_name='Фамилия', password='password-123',
+        )
+
+    def create_recipes(self, count):
+        return [
+            Recipe.objects.create(
+                name=f'Рецепт {i}', author=self.author,
+                image='recipes/images/test.png', text='Описание',
+                cooking_time=10,
+            )
+            for i in range(count)
+        ]
+
+    def test_stale_user_save_keeps_counters(self):
+        stale = User.objects.get(pk=self.author.pk)
+        self.create_recipes(3)
+        Subscription.objects.create(user=self.reader, author=self.author)
+        stale.first_name = 'Другое'
+        stale.save()
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.first_name, 'Другое')
+        self.assertEqual(self.author.recipes_count, 3)
+        self.assertEqual(self.author.subscribers_count, 1)
+
+        token = Token.objects.create(user=self.reader)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        response = self.client.get('/api/users/subscriptions/')
+        self.assertEqual(response.data['results'][0]['recipes_count'], 3)
+
+    def test_stale_recipe_save_keeps_counters(self):
+        recipe = self.create_recipes(1)[0]
+        Favorite.objects.create(user=self.reader, recipe=recipe)
+        recipe.text = 'Новое описание'
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.text, 'Новое описание')
+        self.assertEqual(recipe.favorites_count, 1)
+        self.assertNotEqual(recipe.score, NO_SCORE)
+        call_command('rebuild_counters', check=True, stdout=StringIO())
+
+    def test_admin_forms_exclude_counters(self):
+        request = RequestFactory().get('/')
+        request.user = self.author
+        for model, fields in (
+            (User, {'recipes_count', 'subscribers_count'}),
+            (Recipe, {'favorites_count', 'shopping_cart_count', 'score',
+                      'image_variants_ready'}),
+        ):
+            form = site._registry[model].get_form(request)
+            self.assertFalse(fields & set(form.base_fields))
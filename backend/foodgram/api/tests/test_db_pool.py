@@ -0,0 +1,127 @@
+import os
+
+from django.db import DatabaseError, connection
+from django.test import SimpleTestCase, override_settings
+from psycopg2 import OperationalError
+
+from foodgram.db_pool.base import DatabaseWrapper, pools
+
+from ..metrics import DB_POOL_IN_USE
+
+ALIAS = 'pool-test'
+
+
+class StubCursor:
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, sql):
+        if not self.connection.alive:
+            raise OperationalError('server closed the connection')
+
+
+class StubConnection:
+    isolation_level = 1
+
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.rolled_back = False
+
+    def cursor(self):
+        return StubCursor(self)
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+class StubPool:
+    """Пул psycopg2 без сервера: выдаёт заранее заданные соединения."""
+
+    def __init__(self, *connections):
+        self.available = list(connections)
+        self.returned = []
+        self.closed = False
+        self.error = None
+
+    def getconn(self):
+        return self.available.pop(0)
+
+    def putconn(self, connection, close=False):
+        if self.error:
+            raise self.error
+        self.returned.append((connection, close))
+
+    def closeall(self):
+        self.closed = True
+
+
+class DatabasePoolTest(SimpleTestCase):
+    """Соединения берутся из пула и возвращаются в него вместо закрытия."""
+
+    def setUp(self):
+        self.key = (ALIAS, os.getpid())
+        self.addCleanup(pools.pop, self.key, None)
+        self.addCleanup(DB_POOL_IN_USE.values.pop, (ALIAS,), None)
+        self.wrapper = DatabaseWrapper(
+            {**connection.settings_dict, 'OPTIONS': {}}, ALIAS
+        )
+
+    def in_use(self):
+        return DB_POOL_IN_USE.values.get((ALIAS,), 0)
+
+    def connect(self, pool):
+        pools[self.key] = pool
+        in_use = self.in_use()
+        self.wrapper.connection = self.wrapper.get_new_connection({})
+        self.assertEqual(self.in_use(), in_use + 1)
+        return self.wrapper.connection
+
+    def test_close_returns_connection(self):
+        pool = StubPool(StubConnection())
+        conn = self.connect(pool)
+        in_use = self.in_use()
+        self.wrapper._close()
+        self.assertEqual(pool.returned, [(conn, False)])
+        self.assertEqual(self.in_use(), in_use - 1)
+
+    def test_close_without_connection(self):
+        in_use = self.in_use()
+        self.wrapper._close()
+        self.assertEqual(self.in_use(), in_use)
+
+    def test_putconn_error(self):
+        pool = StubPool(StubConnection())
+        self.connect(pool)
+        pool.error = OperationalError('connection already closed')
+        in_use = self.in_use()
+        with self.assertRaises(DatabaseError):
+            self.wrapper._close()
+        self.assertEqual(self.in_use(), in_use - 1)
+
+    @override_settings(DB_CONN_HEALTH_CHECKS=True)
+    def test_dead_connection_is_replaced(self):
+        dead, alive = StubConnection(alive=False), StubConnection()
+        pool = StubPool(dead, alive)
+        self.assertIs(self.connect(pool), alive)
+        self.assertEqual(pool.returned, [(dead, True)])
+        self.assertEqual(self.wrapper.isolation_level, alive.isolation_level)
+
+    @override_settings(DB_CONN_HEALTH_CHECKS=False)
+    def test_without_health_checks(self):
+        dead = StubConnection(alive=False)
+        self.assertIs(self.connect(StubPool(dead)), dead)
+        self.assertFalse(dead.rolled_back)
+
+    def test_close_pool(self):
+        pool = StubPool()
+        pools[self.key] = pool
+        self.wrapper.close_pool()
+        self.assertTrue(pool.closed)
+        self.assertNotIn(self.key, pools)
@@ -0,0 +1,46 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from rest_framework.test import APITransactionTestCase
+
+from recipes.models import Ingredient
+
+from ..autocomplete import ingredient_index
+from ..cache import CATALOG_VERSION_KEY, get_version
+
+
+class ImportIngredientsTest(APITransactionTestCase):
+    """После импорта ингредиентов индекс и кеш справочников сбрасываются.
+
+    APITransactionTestCase нужен, чтобы срабатывали on_commit.
+    """
+
+    def setUp(self):
+        cache.clear()
+        Ingredient.objects.create(name='Мука', measurement_unit='г')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'ingredients.json')
+        with open(self.path, 'w', encoding='utf-8') as file:
+            json.dump([
+                {'name': 'Мука', 'measurement_unit': 'г'},
+                {'name': 'Мускатный орех', 'measurement_unit': 'г'},
+            ], file, ensure_ascii=False)
+
+    def search(self):
+        response = self.client.get('/api/ingredients/', {'name': 'му'})
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.data]
+
+    def test_import_invalidates_index_and_catalog(self):
+        ingredient_index.load()
+        self.assertEqual(self.search(), ['Мука'])
+        version = get_version(CATALOG_VERSION_KEY)
+        call_command('import_ingredients', path=self.path, stdout=StringIO())
+        self.assertEqual(Ingredient.objects.count(), 2)
+        self.assertEqual(self.search(), ['Мука', 'Мускатный орех'])
+        self.assertGreater(get_version(CATALOG_VERSION_KEY), version)
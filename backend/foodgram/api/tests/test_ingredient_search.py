@@ -0,0 +1,35 @@
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient
+
+from ..autocomplete import ingredient_index
+
+
+class IngredientSearchTest(APITestCase):
+    """Фильтр в БД и индекс в памяти ищут ингредиенты одинаково.
+
+    Названия в нижнем регистре, как в data/ingredients.json: LIKE в
+    SQLite не учитывает регистр только для латиницы.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for name in ('мускатный орех', 'хумус', 'мука', 'сахар'):
+            Ingredient.objects.create(name=name, measurement_unit='г')
+
+    def setUp(self):
+        cache.clear()
+        ingredient_index.load()
+
+    def search(self, query):
+        response = self.client.get('/api/ingredients/', {'name': query})
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.data]
+
+    def test_prefix_first(self):
+        expected = ['мука', 'мускатный орех', 'хумус']
+        self.assertEqual(self.search('му'), expected)
+        with override_settings(INGREDIENT_INDEX_ENABLED=False):
+            self.assertEqual(self.search('му'), expected)
@@ -0,0 +1,99 @@
+import re
+
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from recipes.models import Recipe
+
+from ..instrumentation import InstrumentationMiddleware, query_shape
+from .utils import create_recipe, create_user
+
+SERVER_TIMING = re.compile(
+    r'^db;dur=[\d.]+;desc="(\d+) queries", '
+    r'serializer;dur=([\d.]+), total;dur=[\d.]+$'
+)
+
+
+class InstrumentationTest(APITestCase):
+    """Заголовок Server-Timing и предупреждения о N+1 и медленных запросах."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        cls.recipes = [
+            create_recipe(author, f'Рецепт {i}') for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def middleware(self, get_response):
+        return InstrumentationMiddleware(get_response)(
+            RequestFactory().get('/api/test/')
+        )
+
+    def test_query_shape(self):
+        self.assertEqual(
+            query_shape('SELECT * FROM t WHERE id IN (%s, %s, %s) '
+                        'AND a = 5 LIMIT 21'),
+            'SELECT * FROM t WHERE id IN (...) AND a = N LIMIT N',
+        )
+        self.assertEqual(
+            query_shape('SELECT * FROM t WHERE id = 1'),
+            query_shape('SELECT * FROM t WHERE id = 2'),
+        )
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        match = SERVER_TIMING.match(response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        self.assertEqual(int(match.group(1)), len(queries))
+        self.assertGreater(float(match.group(2)), 0)
+
+    @override_settings(N_PLUS_ONE_THRESHOLD=3)
+    def test_repeated_queries(self):
+        def view(request):
+            for recipe in self.recipes:
+                Recipe.objects.filter(pk=recipe.pk).exists()
+            return HttpResponse()
+
+        with self.assertLogs('api.instrumentation', 'INFO') as logs:
+            self.middleware(view)
+        self.assertIn('repeated_queries=3', logs.output[0])
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn('Возможный N+1', logs.output[1])
+
+        def view(request):
+            Recipe.objects.filter(pk=self.recipes[0].pk).exists()
+            Recipe.objects.count()
+            return HttpResponse()
+
+        with self.assertLogs('api.instrumentation', 'INFO') as logs:
+            self.middleware(view)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('repeated_queries=0', logs.output[0])
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_request(self):
+        def view(request):
+            Recipe.objects.filter(name='секретное значение').exists()
+            return HttpResponse()
+
+        with self.assertLogs('api.instrumentation', 'WARNING') as logs:
+            self.middleware(view)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('Медленный запрос GET /api/test/', logs.output[0])
+        self.assertIn('recipes_recipe', logs.output[0])
+        self.assertNotIn('секретное значение', logs.output[0])
+
+    @override_settings(REQUEST_INSTRUMENTATION=False)
+    def test_disabled(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            InstrumentationMiddleware(HttpResponse)
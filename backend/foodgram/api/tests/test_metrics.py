@@ -0,0 +1,68 @@
+import json
+import os
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from ..metrics import REGISTRY, REQUESTS
+
+
+class MetricsAccessTest(SimpleTestCase):
+    """Метрики отдаются только локальным адресам или по токену."""
+
+    def test_local_address(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_remote_address(self):
+        response = self.client.get('/metrics', REMOTE_ADDR='203.0.113.5')
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        response = self.client.get(
+            '/metrics', REMOTE_ADDR='203.0.113.5',
+            HTTP_AUTHORIZATION='Bearer secret',
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            '/metrics', REMOTE_ADDR='203.0.113.5',
+            HTTP_AUTHORIZATION='Bearer wrong',
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class DeadWorkerMetricsTest(SimpleTestCase):
+    """Счётчики завершившихся воркеров сохраняются в aggregate.json."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = override_settings(METRICS_MULTIPROC_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def write(self, name, snapshot):
+        with open(os.path.join(self.directory, name), 'w') as file:
+            json.dump(snapshot, file)
+
+    def test_dead_files_are_merged_once(self):
+        labels = json.dumps(['dead', 'GET', '200'])
+        self.write('1.1.dead.json', {
+            REQUESTS.name: {labels: 5},
+            'foodgram_db_pool_connections_in_use': {json.dumps(['x']): 3},
+        })
+        self.write('2.2.dead.json', {REQUESTS.name: {labels: 2}})
+        for _ in range(2):
+            collected = REGISTRY.collect()
+            self.assertEqual(
+                collected[REQUESTS.name][('dead', 'GET', '200')], 7
+            )
+            self.assertNotIn(
+                'foodgram_db_pool_connections_in_use', collected
+            )
+        self.assertEqual(
+            sorted(name for name in os.listdir(self.directory)
+                   if name.endswith('.json')),
+            sorted(['aggregate.json', f'{os.getpid()}.json']),
+        )
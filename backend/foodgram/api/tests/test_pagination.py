@@ -0,0 +1,140 @@
+from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from recipes.models import Recipe
+from users.models import User
+
+from ..pagination import CountingPaginator, QueryCounter
+from .utils import create_recipe, create_user
+
+
+class CountingPaginationTest(APITestCase):
+    """Подсчёт строк для постраничного вывода."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        for i in range(8):
+            create_recipe(author, f'Рецепт {i}')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_empty_filters_for_anonymous(self):
+        for query in (
+            'is_favorited=1',
+            'is_in_shopping_cart=1',
+            'is_favorited=1&pagination=cursor&count=true',
+        ):
+            with self.subTest(query):
+                response = self.client.get(f'/api/recipes/?{query}')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data['count'], 0)
+                self.assertEqual(response.data['results'], [])
+
+    def test_counter_on_empty_queryset(self):
+        counter = QueryCounter(cache_timeout=30, estimate_threshold=1)
+        with self.assertNumQueries(0):
+            self.assertEqual(counter(Recipe.objects.none()), (0, False))
+
+    def test_counter_caches_by_query(self):
+        counter = QueryCounter(cache_timeout=30)
+        queryset = Recipe.objects.filter(name__startswith='Рецепт')
+        self.assertEqual(counter(queryset), (8, False))
+        with self.assertNumQueries(0):
+            self.assertEqual(counter(queryset), (8, False))
+        self.assertEqual(
+            counter(queryset.filter(name='Рецепт 1')), (1, False)
+        )
+
+    def test_approximate_count(self):
+        paginator = CountingPaginator(
+            Recipe.objects.order_by('id'), 3,
+            counter=lambda queryset: (1000, True),
+        )
+        self.assertEqual(paginator.count, 1000)
+        self.assertTrue(paginator.page(2).has_next())
+        page = paginator.page(3)
+        self.assertEqual(len(page), 2)
+        self.assertFalse(page.has_next())
+        with self.assertRaises(EmptyPage):
+            paginator.page(4)
+
+
+class KeysetPaginationTest(APITestCase):
+    """Постраничный вывод по ключу."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        for i in range(7):
+            create_recipe(cls.author, f'Рецепт {i}')
+        # Одинаковая дата публикации: порядок задаёт id.
+        Recipe.objects.filter(name__in=['Рецепт 2', 'Рецепт 3',
+                                        'Рецепт 4']).update(
+            pub_date=Recipe.objects.get(name='Рецепт 2').pub_date
+        )
+        for i in range(4):
+            create_user(f'user-{i}')
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, url):
+        """Id со всех страниц, по ссылкам next."""
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIsNone(response.data['previous'])
+            ids += [item['id'] for item in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def test_recipes_order(self):
+        self.assertEqual(
+            self.walk('/api/recipes/?pagination=cursor&limit=2'),
+            list(Recipe.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            )),
+        )
+
+    def test_users_order(self):
+        self.assertEqual(
+            self.walk('/api/users/?pagination=cursor&limit=3'),
+            list(User.objects.order_by('id').values_list('id', flat=True)),
+        )
+
+    def test_cursor_round_trip(self):
+        response = self.client.get('/api/recipes/?pagination=cursor&limit=3')
+        first = [item['id'] for item in response.data['results']]
+        next_url = response.data['next']
+        self.assertNotIn('pagination=', next_url)
+        # Новый рецепт попадает в начало списка и не сдвигает страницы.
+        create_recipe(self.author, 'Новый', pub_date=timezone.now())
+        cache.clear()
+        response = self.client.get(next_url)
+        second = [item['id'] for item in response.data['results']]
+        self.assertFalse(set(first) & set(second))
+        self.assertEqual(
+            first + second,
+            list(Recipe.objects.exclude(name='Новый').order_by(
+                '-pub_date', '-id'
+            ).values_list('id', flat=True)[:6]),
+        )
+
+    def test_count_on_request(self):
+        response = self.client.get('/api/recipes/?pagination=cursor')
+        self.assertIsNone(response.data['count'])
+        response = self.client.get(
+            '/api/recipes/?pagination=cursor&count=true'
+        )
+        self.assertEqual(response.data['count'], 7)
+
+    def test_invalid_cursor(self):
+        for cursor in ('garbage', 'WyJ4Il0=', 'WzFd'):
+            with self.subTest(cursor):
+                response = self.client.get(f'/api/recipes/?cursor={cursor}')
+                self.assertEqual(response.status_code, 404)
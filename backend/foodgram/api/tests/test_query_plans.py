@@ -0,0 +1,33 @@
+from unittest import skipUnless
+
+from django.db import connection
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from ..query_plans import check_endpoints, seed_plan_data, without_seqscan
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Нужен PostgreSQL.')
+class QueryPlansTest(APITestCase):
+    """Выборки основных эндпоинтов не читают таблицы целиком.
+
+    Последовательное чтение запрещено, поэтому Seq Scan в плане
+    означает, что у запроса нет подходящего индекса.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_plan_data(300)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_plans(self):
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        with without_seqscan():
+            reports = check_endpoints(self.client)
+        for report in reports:
+            with self.subTest(report.label):
+                self.assertEqual(report.status_code, 200)
+                self.assertFalse(report.scans, str(report))
+                self.assertFalse(report.small_scans, str(report))
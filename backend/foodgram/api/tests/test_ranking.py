@@ -0,0 +1,72 @@
+import math
+from datetime import timedelta
+
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from recipes.models import NO_SCORE, Favorite, Recipe, ShoppingCart
+from recipes.ranking import (SCORE_EPOCH, activity_score, add_score,
+                             rebuild_scores, subtract_score)
+
+from .utils import create_recipe, create_user
+
+
+class RankingTest(APITestCase):
+    """Популярность в логарифмах: сложение, вычитание и пересчёт."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.readers = [create_user(f'reader{i}') for i in range(3)]
+        cls.recipes = [
+            create_recipe(cls.author, f'Рецепт {i}') for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def apply(self, expression, recipe=None):
+        recipe = recipe or self.recipes[0]
+        Recipe.objects.filter(pk=recipe.pk).update(score=expression)
+        recipe.refresh_from_db()
+        return recipe.score
+
+    def test_add_and_subtract(self):
+        self.assertEqual(self.recipes[0].score, NO_SCORE)
+        self.assertEqual(self.apply(add_score(3.0)), 3.0)
+        self.assertAlmostEqual(self.apply(add_score(3.0)), 3.0 + math.log(2))
+        self.assertAlmostEqual(self.apply(subtract_score(3.0)), 3.0)
+        self.assertEqual(self.apply(subtract_score(3.0)), NO_SCORE)
+
+    def test_large_scores_do_not_overflow(self):
+        self.apply(add_score(1e5))
+        self.assertAlmostEqual(self.apply(add_score(1e5 + 1)),
+                               1e5 + 1 + math.log(1 + math.exp(-1)))
+
+    def test_negative_scores_are_trending(self):
+        # Действие задолго до SCORE_EPOCH даёт отрицательный логарифм.
+        old = activity_score(Favorite, SCORE_EPOCH - timedelta(days=365))
+        self.assertLess(old, 0)
+        self.assertEqual(self.apply(add_score(old)), old)
+        response = self.client.get('/api/recipes/trending/')
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.recipes[0].id],
+        )
+
+    def test_rebuild_matches_signals(self):
+        for reader in self.readers:
+            Favorite.objects.create(user=reader, recipe=self.recipes[0])
+        ShoppingCart.objects.create(
+            user=self.readers[0], recipe=self.recipes[1]
+        )
+        Favorite.objects.filter(recipe=self.recipes[0]).first().delete()
+        incremental = dict(Recipe.objects.values_list('id', 'score'))
+        Recipe.objects.update(score=0)
+        self.assertEqual(rebuild_scores(), 2)
+        rebuilt = dict(Recipe.objects.values_list('id', 'score'))
+        for recipe in self.recipes:
+            self.assertAlmostEqual(
+                rebuilt[recipe.id], incremental[recipe.id], places=6
+            )
+        self.assertEqual(rebuilt[self.recipes[2].id], NO_SCORE)
@@ -0,0 +1,71 @@
+import base64
+import tempfile
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITransactionTestCase
+
+from recipes.images import schedule_image_processing, variant_names
+from recipes.models import Recipe
+
+from .utils import create_recipe, create_user
+
+
+def png(color):
+    buffer = BytesIO()
+    Image.new('RGB', (32, 32), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class RecipeImageVariantsTest(APITransactionTestCase):
+    """Копии картинки удаляются вместе с картинкой или рецептом."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(
+            MEDIA_ROOT=directory.name,
+            IMAGE_PROCESSING_BACKEND='recipes.images.sync_backend',
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.author = create_user('author')
+        token = Token.objects.create(user=self.author)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        image = default_storage.save(
+            'recipes/images/first.png', ContentFile(png('red'))
+        )
+        self.recipe = create_recipe(self.author, 'Рецепт', image=image)
+        schedule_image_processing(self.recipe)
+
+    def assertVariants(self, image_name, exist):
+        for name in variant_names(image_name):
+            with self.subTest(name):
+                self.assertEqual(default_storage.exists(name), exist)
+
+    def test_replace_image(self):
+        previous = self.recipe.image.name
+        self.assertVariants(previous, True)
+        data = base64.b64encode(png('blue')).decode()
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe.id}/',
+            {'image': f'data:image/png;base64,{data}'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.recipe.refresh_from_db()
+        self.assertNotEqual(self.recipe.image.name, previous)
+        self.assertTrue(self.recipe.image_variants_ready)
+        self.assertVariants(previous, False)
+        self.assertVariants(self.recipe.image.name, True)
+
+    def test_delete_recipe(self):
+        image_name = self.recipe.image.name
+        response = self.client.delete(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Recipe.objects.exists())
+        self.assertVariants(image_name, False)
@@ -0,0 +1,64 @@
+from unittest import skipIf, skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from rest_framework.test import APITestCase
+
+from .utils import create_recipe, create_user
+
+
+class RecipeSearchTest(APITestCase):
+    """Поиск рецептов по названию и описанию."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.other = create_user('other')
+        cls.in_text = create_recipe(
+            cls.author, 'суп', text='на основе борща из свёклы'
+        )
+        cls.old_name = create_recipe(cls.author, 'борщ зелёный')
+        cls.new_name = create_recipe(cls.other, 'борщ украинский')
+        create_recipe(cls.author, 'салат', text='огурцы и помидоры')
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query):
+        response = self.client.get(f'/api/recipes/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_ranking(self):
+        # Совпадения в названии выше совпадений в описании, при равном
+        # ранге - новые рецепты первыми.
+        self.assertEqual(
+            self.search('search=борщ'),
+            [self.new_name.id, self.old_name.id, self.in_text.id],
+        )
+
+    def test_with_filters(self):
+        self.assertEqual(
+            self.search(f'search=борщ&author={self.author.id}'),
+            [self.old_name.id, self.in_text.id],
+        )
+        self.assertEqual(self.search('search=пельмени'), [])
+
+    def test_search_disables_cursor(self):
+        response = self.client.get('/api/recipes/?search=борщ'
+                                   '&pagination=cursor')
+        self.assertEqual(response.data['count'], 3)
+        self.assertNotIn('cursor=', response.data['next'] or '')
+
+    @skipIf(connection.vendor == 'postgresql', 'Поиск подстроки не нужен.')
+    def test_substring_fallback(self):
+        self.assertEqual(self.search('search=орщ'),
+                         [self.new_name.id, self.old_name.id,
+                          self.in_text.id])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Нужен PostgreSQL.')
+    def test_word_forms(self):
+        self.assertEqual(
+            set(self.search('search=борщи')),
+            {self.new_name.id, self.old_name.id, self.in_text.id},
+        )
@@ -0,0 +1,71 @@
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, RecipeIngredient, ShoppingCart, Tag
+
+from .utils import create_recipe, create_user
+
+
+class RecipeUpdateQueriesTest(APITestCase):
+    """Число запросов при правке рецепта не зависит от числа ингредиентов."""
+
+    # Одинаково для правки любого размера: теги и ингредиенты удаляются,
+    # обновляются и добавляются одним запросом на операцию.
+    QUERIES = 22
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tags = [
+            Tag.objects.create(name=f'Тег {i}', color=f'#00000{i}',
+                               slug=f'tag-{i}')
+            for i in range(4)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {i}',
+                                      measurement_unit='г')
+            for i in range(60)
+        ]
+
+    def setUp(self):
+        token = Token.objects.create(user=self.author)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def create_recipe(self, name):
+        recipe = create_recipe(self.author, name)
+        recipe.tags.set(self.tags[:2])
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+            for ingredient in self.ingredients[:40]
+        )
+        ShoppingCart.objects.create(user=self.author, recipe=recipe)
+        return recipe
+
+    def edit(self, recipe, size):
+        """Удаляет, меняет и добавляет по size ингредиентов и тег."""
+        ingredients = [
+            {'id': ingredient.id, 'amount': 10}
+            for ingredient in self.ingredients[size:40]
+        ]
+        for ingredient in ingredients[:size]:
+            ingredient['amount'] = 20
+        ingredients += [
+            {'id': ingredient.id, 'amount': 5}
+            for ingredient in self.ingredients[40:40 + size]
+        ]
+        with self.assertNumQueries(self.QUERIES):
+            response = self.client.patch(
+                f'/api/recipes/{recipe.id}/',
+                {
+                    'ingredients': ingredients,
+                    'tags': [tag.id for tag in self.tags[1:3]],
+                },
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['ingredients']), 40)
+
+    def test_constant_queries(self):
+        for size in (1, 10):
+            with self.subTest(size=size):
+                self.edit(self.create_recipe(f'Рецепт {size}'), size)
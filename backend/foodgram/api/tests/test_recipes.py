@@ -0,0 +1,124 @@
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import Subscription, User
+
+
+class RecipeListQueriesTest(APITestCase):
+    """Число запросов к БД для списка рецептов не зависит от его размера."""
+
+    @classmethod
+    def setUpTestData(cls):
+        tags = [
+            Tag.objects.create(name=f'Тег {i}', color=f'#00000{i}',
+                               slug=f'tag-{i}')
+            for i in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {i}',
+                                      measurement_unit='г')
+            for i in range(5)
+        ]
+        cls.user = User.objects.create_user(
+            email='reader@foodgram.local', username='reader',
+            first_name='Имя', last_name='Фамилия', password='password-123',
+        )
+        authors = [
+            User.objects.create_user(
+                email=f'author{i}@foodgram.local', username=f'author{i}',
+                first_name='Имя', last_name='Фамилия',
+                password='password-123',
+            )
+            for i in range(3)
+        ]
+        Subscription.objects.create(user=cls.user, author=authors[0])
+        for i in range(60):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {i}', author=authors[i % len(authors)],
+                image='recipes/images/test.png', text='Описание',
+                cooking_time=10,
+            )
+            recipe.tags.set(tags[:i % 3 + 1])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                                 amount=10)
+                for ingredient in ingredients[:i % 5 + 1]
+            )
+            if i % 4 == 0:
+                Favorite.objects.create(user=cls.user, recipe=recipe)
+            if i % 5 == 0:
+                ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def assert_list_queries(self, expected):
+        for limit in (6, 50):
+            with self.subTest(limit=limit):
+                cache.clear()
+                with self.assertNumQueries(expected):
+                    response = self.client.get(
+                        '/api/recipes/', {'limit': limit}
+                    )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_anonymous(self):
+        # count, страница рецептов с авторами, теги, связи с
+        # ингредиентами, ингредиенты.
+        self.assert_list_queries(5)
+
+    def test_anonymous_cached(self):
+        self.client.get('/api/recipes/', {'limit': 6})
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/recipes/', {'limit': 6})
+        self.assertEqual(len(response.data['results']), 6)
+
+    def test_authenticated(self):
+        # Плюс токен и id авторов, на которых подписан пользователь.
+        # Флаги избранного и корзины - подзапросы основного запроса.
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assert_list_queries(7)
+
+
+class RecipeDetailCacheTest(APITransactionTestCase):
+    """Повторный анонимный запрос рецепта не обращается к БД.
+
+    Кеш сбрасывается после фиксации транзакции, поэтому тест
+    выполняется без обёртки в транзакцию.
+    """
+
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(
+            email='author@foodgram.local', username='author',
+            first_name='Имя', last_name='Фамилия', password='password-123',
+        )
+        self.recipe = Recipe.objects.create(
+            name='Рецепт', author=author, image='recipes/images/test.png',
+            text='Описание', cooking_time=10,
+        )
+        self.url = f'/api/recipes/{self.recipe.id}/'
+
+    def test_cached_detail(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], etag)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_invalidates_validators(self):
+        etag = self.client.get(self.url)['ETag']
+        self.recipe.text = 'Новое описание'
+        self.recipe.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['text'], 'Новое описание')
+        self.assertNotEqual(response['ETag'], etag)
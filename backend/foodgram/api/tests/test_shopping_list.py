@@ -0,0 +1,138 @@
+from io import StringIO
+
+from django.core.management import call_command
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITransactionTestCase
+
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingListItem, Tag)
+from users.models import User
+
+
+class ShoppingListConsistencyTest(APITransactionTestCase):
+    """Список покупок пересчитывается после правок и удаления рецептов.
+
+    Проверяются API, админка и каскадное удаление вместе с автором.
+
+    APITransactionTestCase нужен, чтобы срабатывали on_commit.
+    """
+
+    def setUp(self):
+        self.author = self.create_user('author')
+        self.buyers = [self.create_user(f'buyer{i}') for i in range(3)]
+        self.ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {i}',
+                                      measurement_unit='г')
+            for i in range(4)
+        ]
+        self.recipes = [self.create_recipe(i) for i in range(2)]
+        for buyer in self.buyers:
+            for recipe in self.recipes:
+                ShoppingCart.objects.create(user=buyer, recipe=recipe)
+        # Прямые изменения корзин через ORM списки не пересчитывают.
+        ShoppingListItem.objects.rebuild()
+
+    @staticmethod
+    def create_user(name):
+        return User.objects.create_user(
+            email=f'{name}@foodgram.local', username=name,
+            first_name='Имя', last_name='Фамилия', password='password-123',
+        )
+
+    def create_recipe(self, index):
+        recipe = Recipe.objects.create(
+            name=f'Рецепт {index}', author=self.author,
+            image='recipes/images/test.png', text='Описание',
+            cooking_time=10,
+        )
+        for ingredient in self.ingredients[index:index + 3]:
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=10 * (index + 1)
+            )
+        return recipe
+
+    def assert_consistent(self):
+        call_command('rebuild_shopping_lists', check=True, stdout=StringIO())
+
+    def test_recipe_update(self):
+        self.assert_consistent()
+        self.assertEqual(
+            ShoppingListItem.objects.get(
+                user=self.buyers[0], ingredient=self.ingredients[1]
+            ).amount,
+            30,
+        )
+        tag = Tag.objects.create(name='Тег', color='#000000', slug='tag')
+        token = Token.objects.create(user=self.author)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        response = self.client.patch(
+            f'/api/recipes/{self.recipes[0].id}/',
+            {
+                'tags': [tag.id],
+                'ingredients': [
+                    {'id': self.ingredients[1].id, 'amount': 99},
+                    {'id': self.ingredients[3].id, 'amount': 5},
+                ],
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_consistent()
+        self.assertFalse(ShoppingListItem.objects.filter(
+            ingredient=self.ingredients[0]
+        ).exists())
+
+    def test_admin_changes(self):
+        admin = User.objects.create_superuser(
+            email='admin@foodgram.local', username='admin',
+            first_name='Имя', last_name='Фамилия', password='password-123',
+        )
+        self.client.force_login(admin)
+        item = RecipeIngredient.objects.filter(recipe=self.recipes[0]).first()
+        response = self.client.post(
+            f'/admin/recipes/recipeingredient/{item.id}/change/',
+            {
+                'recipe': item.recipe_id,
+                'ingredient': self.ingredients[3].id,
+                'amount': 99,
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assert_consistent()
+        response = self.client.post(
+            f'/admin/recipes/recipeingredient/{item.id}/delete/',
+            {'post': 'yes'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assert_consistent()
+        cart = ShoppingCart.objects.filter(user=self.buyers[1]).first()
+        response = self.client.post(
+            f'/admin/recipes/shoppingcart/{cart.id}/delete/',
+            {'post': 'yes'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assert_consistent()
+
+    def test_recipe_delete(self):
+        self.recipes[0].delete()
+        self.assert_consistent()
+        self.assertFalse(ShoppingListItem.objects.filter(
+            ingredient=self.ingredients[0]
+        ).exists())
+
+    def test_author_delete(self):
+        self.author.delete()
+        self.assert_consistent()
+        self.assertFalse(ShoppingListItem.objects.exists())
+
+    def test_api(self):
+        buyer = self.buyers[0]
+        token = Token.objects.create(user=buyer)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        url = f'/api/recipes/{self.recipes[1].id}/shopping_cart/'
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, 204)
+        self.assert_consistent()
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 201)
+        self.assert_consistent()
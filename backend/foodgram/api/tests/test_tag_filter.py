@@ -0,0 +1,87 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from recipes.models import Tag
+
+from .utils import create_recipe, create_user
+
+
+class TagFilterTest(APITestCase):
+    """Фильтр рецептов по тегам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        breakfast, dinner, vegan = (
+            Tag.objects.create(name=name, color=f'#00000{i}', slug=name)
+            for i, name in enumerate(('breakfast', 'dinner', 'vegan'))
+        )
+        cls.both = create_recipe(author, 'Оба тега')
+        cls.both.tags.set([breakfast, dinner])
+        cls.breakfast = create_recipe(author, 'Завтрак')
+        cls.breakfast.tags.set([breakfast, vegan])
+        cls.untagged = create_recipe(author, 'Без тегов')
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, query):
+        return self.client.get(f'/api/recipes/?{query}')
+
+    def ids(self, query):
+        response = self.get(query)
+        self.assertEqual(response.status_code, 200)
+        return {item['id'] for item in response.data['results']}
+
+    def test_any(self):
+        expected = {self.both.id, self.breakfast.id}
+        self.assertEqual(self.ids('tags=breakfast&tags=dinner'), expected)
+        self.assertEqual(
+            self.ids('tags=breakfast&tags=dinner&tags_mode=any'), expected
+        )
+        self.assertEqual(self.ids('tags=dinner'), {self.both.id})
+
+    def test_all(self):
+        self.assertEqual(
+            self.ids('tags=breakfast&tags=dinner&tags_mode=all'),
+            {self.both.id},
+        )
+        self.assertEqual(
+            self.ids('tags=dinner&tags=vegan&tags_mode=all'), set()
+        )
+        self.assertEqual(
+            self.ids('tags=breakfast&tags_mode=all'),
+            {self.both.id, self.breakfast.id},
+        )
+
+    def test_no_duplicates(self):
+        response = self.get('tags=breakfast&tags=dinner&tags=vegan')
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_invalid_values(self):
+        for query in (
+            'tags=unknown',
+            'tags=breakfast&tags=unknown',
+            'tags=breakfast&tags_mode=some',
+        ):
+            with self.subTest(query):
+                self.assertEqual(self.get(query).status_code, 400)
+
+
+class TagFilterCacheTest(APITransactionTestCase):
+    """Новый тег сразу доступен в фильтре."""
+
+    def test_new_tag(self):
+        cache.clear()
+        recipe = create_recipe(create_user('author'), 'Рецепт')
+        response = self.client.get('/api/recipes/?tags=soup')
+        self.assertEqual(response.status_code, 400)
+        recipe.tags.add(
+            Tag.objects.create(name='Суп', color='#000000', slug='soup')
+        )
+        response = self.client.get('/api/recipes/?tags=soup')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['id'] for item in response.data['results']], [recipe.id]
+        )
@@ -0,0 +1,96 @@
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITransactionTestCase
+
+from recipes.models import Recipe, TimelineEntry
+from users.models import Subscription
+
+from .utils import create_recipe, create_user
+
+
+class TimelineTest(APITransactionTestCase):
+    """Лента подписок: запись при публикации и подмешивание при чтении."""
+
+    def setUp(self):
+        cache.clear()
+        self.reader = create_user('reader')
+        self.author = create_user('author')
+        token = Token.objects.create(user=self.reader)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def timeline(self, user=None):
+        return list(TimelineEntry.objects.filter(
+            user=user or self.reader
+        ).order_by('-pub_date', '-recipe_id').values_list(
+            'recipe_id', flat=True
+        ))
+
+    def latest(self, authors, limit=None):
+        return list(Recipe.objects.filter(author__in=authors).order_by(
+            '-pub_date', '-id'
+        ).values_list('id', flat=True)[:limit])
+
+    def feed(self, limit=2):
+        """Id рецептов ленты со всех страниц, по ссылкам next."""
+        ids = []
+        url = f'/api/recipes/feed/?limit={limit}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [item['id'] for item in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def test_push(self):
+        other = create_user('other')
+        Subscription.objects.create(user=self.reader, author=self.author)
+        recipe = create_recipe(self.author, 'Рецепт')
+        self.assertEqual(self.timeline(), [recipe.id])
+        self.assertEqual(self.timeline(other), [])
+        self.assertEqual(self.feed(), [recipe.id])
+
+    def test_follow_and_unfollow(self):
+        for i in range(3):
+            create_recipe(self.author, f'Рецепт {i}')
+        response = self.client.post(f'/api/users/{self.author.id}/subscribe/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.timeline(), self.latest([self.author]))
+        self.assertEqual(self.feed(), self.latest([self.author]))
+
+        response = self.client.delete(
+            f'/api/users/{self.author.id}/subscribe/'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.timeline(), [])
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(FEED_SIZE=3)
+    def test_trim(self):
+        for i in range(5):
+            create_recipe(self.author, f'Рецепт {i}')
+        Subscription.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.timeline(), self.latest([self.author], 3))
+        create_recipe(self.author, 'Новый')
+        self.assertEqual(self.timeline(), self.latest([self.author], 3))
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_pull_and_push_merge(self):
+        # У популярного автора подписчиков больше FEED_FANOUT_LIMIT:
+        # его рецепты не записываются в ленты, а читаются при запросе.
+        popular = create_user('popular')
+        for name in ('first', 'second'):
+            Subscription.objects.create(user=create_user(name),
+                                        author=popular)
+        popular.refresh_from_db()
+        Subscription.objects.create(user=self.reader, author=popular)
+        Subscription.objects.create(user=self.reader, author=self.author)
+        popular.refresh_from_db()
+        self.author.refresh_from_db()
+        for i in range(3):
+            create_recipe(popular, f'Популярный {i}')
+            create_recipe(self.author, f'Рецепт {i}')
+        self.assertEqual(self.timeline(), self.latest([self.author]))
+        self.assertEqual(
+            self.feed(), self.latest([popular, self.author])
+        )
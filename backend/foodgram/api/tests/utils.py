@@ -0,0 +1,16 @@
+from recipes.models import Recipe
+from users.models import User
+
+
+def create_user(name):
+    return User.objects.create_user(
+        email=f'{name}@foodgram.local', username=name,
+        first_name='Имя', last_name='Фамилия', password='password-123',
+    )
+
+
+def create_recipe(author, name, **fields):
+    fields.setdefault('image', 'recipes/images/test.png')
+    fields.setdefault('text', 'Описание')
+    fields.setdefault('cooking_time', 10)
+    return Recipe.objects.create(name=name, author=author, **fields)
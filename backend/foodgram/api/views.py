@@ -1,29 +1,51 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.db.models import (BooleanField, Exists, F, OuterRef, Subquery,
+                              Value)
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+from recipes.models import (NO_SCORE, Favorite, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, ShoppingListItem,
+                            Tag)
+from users.models import Subscription
 
+from .autocomplete import ingredient_index
+from .cache import AnonymousCacheMixin, recipe_validators_key
+from .conditional import ConditionalGetMixin, catalog_validators
 from .filters import IngredientSearchFilter, RecipeFilter
-from .pagination import CustomPagination
+from .pagination import CustomPagination, TimelinePagination
+from .pantry import pantry_index
 from .permission import IsOwner
+from .renderers import CHUNK_ROWS, SHOPPING_LIST_RENDERERS
 from .serializers import (FavoriteSerializer, IngredientSerializer,
                           RecipeCreateSerializer, RecipeSerializer,
                           ShoppingCartSerializer, TagSerializer)
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+COOKABLE_LIMIT = 20
+COOKABLE_MAX_LIMIT = 100
+
+
+class TagViewSet(ConditionalGetMixin, ReadOnlyModelViewSet):
     """Вьюсет тегов."""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
 
+    def get_validators(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        if 'pk' in kwargs:
+            if not str(kwargs['pk']).isdigit():
+                return None
+            queryset = queryset.filter(pk=kwargs['pk'])
+        return catalog_validators(queryset)
+
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, ReadOnlyModelViewSet):
     """Вьюсет игридиентов."""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
@@ -32,8 +54,35 @@ class IngredientViewSet(ReadOnlyModelViewSet):
     filterset_class = IngredientSearchFilter
     search_fields = ('name',)
 
+    def get_validators(self, request, *args, **kwargs):
+        if 'pk' in kwargs:
+            if not str(kwargs['pk']).isdigit():
+                return None
+            return catalog_validators(
+                self.get_queryset().filter(pk=kwargs['pk'])
+            )
+        if settings.INGREDIENT_INDEX_ENABLED:
+            return ingredient_index.validators()
+        return catalog_validators(self.get_queryset())
+
+    def list(self, request, *args, **kwargs):
+        if not settings.INGREDIENT_INDEX_ENABLED:
+            return super().list(request, *args, **kwargs)
+        return self.dispatch_conditional(
+            self.search, request, *args, **kwargs
+        )
 
-class RecipeViewSet(ModelViewSet):
+    def search(self, request, *args, **kwargs):
+        limit = request.query_params.get('limit')
+        if limit is not None and not limit.isdigit():
+            raise ValidationError({'limit': 'Укажите целое число.'})
+        return Response(ingredient_index.search(
+            request.query_params.get('name', ''),
+            int(limit) if limit else None,
+        ))
+
+
+class RecipeViewSet(ConditionalGetMixin, AnonymousCacheMixin, ModelViewSet):
     """Вьюсет рецептов."""
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
@@ -41,11 +90,73 @@ class RecipeViewSet(ModelViewSet):
     permission_classes = (IsOwner,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    conditional_actions = ('retrieve',)
+    count_cache_timeout = settings.RECIPE_COUNT_CACHE_TIMEOUT
+    count_estimate_threshold = settings.RECIPE_COUNT_ESTIMATE_THRESHOLD
+
+    def get_validators(self, request, *args, **kwargs):
+        if not str(kwargs['pk']).isdigit():
+            return None
+        pk = int(kwargs['pk'])
+        return self.cached_validators(
+            recipe_validators_key(pk),
+            lambda: self.load_validators(request.user, pk),
+            request,
+        )
+
+    @staticmethod
+    def load_validators(user, pk):
+        queryset = Recipe.objects.filter(
+            pk=pk
+        ).with_user_flags(user).annotate(
+            tags_updated=Subquery(
+                Tag.objects.filter(
+                    recipe=OuterRef('pk')
+                ).order_by('-updated').values('updated')[:1]
+            ),
+            ingredients_updated=Subquery(
+                RecipeIngredient.objects.filter(
+                    recipe=OuterRef('pk')
+                ).order_by('-ingredient__updated').values(
+                    'ingredient__updated'
+                )[:1]
+            ),
+            is_subscribed=Value(False, output_field=BooleanField())
+            if user.is_anonymous else Exists(
+                Subscription.objects.filter(
+                    user=user, author=OuterRef('author')
+                )
+            ),
+        )
+        row = queryset.values_list(
+            'updated', 'tags_updated', 'ingredients_updated',
+            'image_variants_ready', 'is_favorited', 'is_in_shopping_cart',
+            'is_subscribed', 'author__email', 'author__username',
+            'author__first_name', 'author__last_name',
+        ).first()
+        if row is None:
+            return None
+        return row, max(date for date in row[:3] if date is not None)
+
+    @property
+    def keyset_ordering(self):
+        """Курсор доступен только для списка в порядке публикации."""
+        if self.action == 'list' and not (
+            {'ordering', 'search'} & self.request.GET.keys()
+        ):
+            return ('-pub_date', '-id')
+        return None
+
+    def get_cache_control(self, request):
+        if request.user.is_anonymous:
+            return {'public': True, 'max_age': 0, 'must_revalidate': True}
+        return {'private': True, 'no_cache': True}
+
+    def get_queryset(self):
+        return Recipe.objects.with_related().with_user_flags(
+            self.request.user
+        )
 
-    @action(
-        detail=False,
-        methods=['get'],
-    )
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipeSerializer
@@ -76,44 +187,113 @@ class RecipeViewSet(ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def shopping_cart(self, request, pk):
-        return self.add_recipes(
+        response = self.add_recipes(
             request, pk, ShoppingCartSerializer
         )
+        ShoppingListItem.objects.schedule_recipe_refresh(
+            pk, users=[request.user.id]
+        )
+        return response
 
     @shopping_cart.mapping.delete
     def delete_shopping_cart(self, request, pk):
-        return self.delete_recipes(
+        response = self.delete_recipes(
             request, pk, ShoppingCart
         )
+        ShoppingListItem.objects.schedule_recipe_refresh(
+            pk, users=[request.user.id]
+        )
+        return response
 
-    @action(detail=False, permission_classes=[IsAuthenticated])
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        renderer_classes=SHOPPING_LIST_RENDERERS,
+    )
     def download_shopping_cart(self, request):
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shopping_cart__user=request.user,
+        ingredients = ShoppingListItem.objects.filter(
+            user=request.user,
+        ).order_by(
+            'ingredient__name', 'ingredient__measurement_unit',
         ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit',
-        ).annotate(
-            amount=Sum('amount'),
+            'amount',
+            name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit'),
         )
 
-        shopping_list = ''
-        pattern_item_info = (
-            '* Наименование: {name}, Ед. изм.:{m_unit}, Кол-во: {amount}\n'
+        renderer = request.accepted_renderer
+        rows = ingredients.iterator(chunk_size=CHUNK_ROWS)
+        response = StreamingHttpResponse(
+            renderer.stream(rows),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
         )
-        for i in ingredients:
-            item_info = pattern_item_info.format(
-                name=i['ingredient__name'],
-                m_unit=i['ingredient__measurement_unit'],
-                amount=i['amount'],
-            )
-            shopping_list += item_info
-
-        filename = 'shopping_list'
-        response = HttpResponse(shopping_list, content_type='text/plain')
+        filename = f'shopping_list.{renderer.format}'
         response['Content-Disposition'] = f'attachment; filename={filename}'
         return response
 
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        """Рецепты авторов, на которых подписан пользователь."""
+        paginator = TimelinePagination()
+        page = paginator.paginate_timeline(self.get_queryset(), request)
+        serializer = RecipeSerializer(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False)
+    def trending(self, request):
+        """Рецепты по убыванию популярности с учётом давности."""
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            score__gt=NO_SCORE
+        ).order_by('-score', '-pub_date', '-id')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False)
+    def cookable(self, request):
+        """Рецепты, для которых хватает указанных ингредиентов.
+
+        ?ingredients=1,2,3 - имеющиеся ингредиенты, ?max_missing=N -
+        сколько ингредиентов может не хватать, ?limit=K - размер выдачи.
+        """
+        params = request.query_params
+        ingredients = [
+            value for item in params.getlist('ingredients')
+            for value in item.split(',') if value
+        ]
+        if not ingredients or not all(
+            value.isdigit() for value in ingredients
+        ):
+            raise ValidationError(
+                {'ingredients': 'Укажите id ингредиентов через запятую.'}
+            )
+        for name in ('limit', 'max_missing'):
+            if not params.get(name, '0').isdigit():
+                raise ValidationError({name: 'Укажите целое число.'})
+        limit = min(
+            int(params.get('limit') or COOKABLE_LIMIT), COOKABLE_MAX_LIMIT
+        )
+        max_missing = params.get('max_missing')
+        matches = pantry_index.search(
+            map(int, ingredients),
+            limit,
+            int(max_missing) if max_missing else None,
+        )
+        recipes = self.get_queryset().in_bulk(
+            [recipe for recipe, _, _ in matches]
+        )
+        matches = [match for match in matches if match[0] in recipes]
+        serializer = self.get_serializer(
+            [recipes[recipe] for recipe, _, _ in matches], many=True
+        )
+        data = serializer.data
+        for item, (_, matched, missing) in zip(data, matches):
+            item['matched_ingredients'] = matched
+            item['missing_ingredients'] = missing
+        return Response(data)
+
     @action(detail=True, methods=['post'])
     def favorite(self, request, pk):
         return self.add_recipes(
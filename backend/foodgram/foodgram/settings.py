@@ -1,5 +1,6 @@
 # flake8: noqa
 import os
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -28,12 +29,14 @@ INSTALLED_APPS = [
     'colorfield',
     'admin_interface',
 
-    'users',
-    'recipes',
-    'api',
+    'users.apps.UsersConfig',
+    'recipes.apps.RecipesConfig',
+    'api.apps.ApiConfig',
 ]
 
 MIDDLEWARE = [
+    'api.instrumentation.InstrumentationMiddleware',
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -72,10 +75,46 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default=5432)
+        'PORT': os.getenv('DB_PORT', default=5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
     }
 }
 
+# Проверка сохранённых и взятых из пула соединений перед использованием.
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+
+# Пул соединений внутри процесса, только для PostgreSQL. Соединения
+# возвращаются в пул после каждого запроса вместо CONN_MAX_AGE.
+DB_POOL = os.getenv('DB_POOL', 'False') == 'True'
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 2))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+if DB_POOL and DATABASES['default']['ENGINE'].endswith('postgresql'):
+    DATABASES['default']['ENGINE'] = 'foodgram.db_pool'
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+
+# Кеш в памяти процесса подходит только для одного процесса: версии,
+# которыми сбрасываются закешированные ответы, ETag и индексы в памяти
+# (api/cache.py, api/autocomplete.py, api/pantry.py), другим воркерам
+# не видны. При GUNICORN_WORKERS > 1 задайте общий кеш, например
+# CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache и
+# CACHE_LOCATION=cache_table (таблицу создаёт manage.py createcachetable)
+# или memcached.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+RECIPE_CACHE_TIMEOUT = int(os.getenv('RECIPE_CACHE_TIMEOUT', 300))
+CATALOG_MAX_AGE = int(os.getenv('CATALOG_MAX_AGE', 60))
+RECIPE_COUNT_CACHE_TIMEOUT = int(os.getenv('RECIPE_COUNT_CACHE_TIMEOUT', 30))
+RECIPE_COUNT_ESTIMATE_THRESHOLD = int(
+    os.getenv('RECIPE_COUNT_ESTIMATE_THRESHOLD', 100_000)
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -138,3 +177,50 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+IMAGE_PROCESSING_BACKEND = os.getenv(
+    'IMAGE_PROCESSING_BACKEND', 'recipes.images.thread_pool_backend'
+)
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', 2))
+
+INGREDIENT_INDEX_ENABLED = os.getenv('INGREDIENT_INDEX_ENABLED', 'True') == 'True'
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', 300))
+
+FEED_SIZE = int(os.getenv('FEED_SIZE', 1000))
+FEED_FANOUT_LIMIT = int(os.getenv('FEED_FANOUT_LIMIT', 10_000))
+
+RECIPE_SCORE_HALF_LIFE_DAYS = float(
+    os.getenv('RECIPE_SCORE_HALF_LIFE_DAYS', 7)
+)
+if not 0 < RECIPE_SCORE_HALF_LIFE_DAYS < float('inf'):
+    raise ImproperlyConfigured(
+        'RECIPE_SCORE_HALF_LIFE_DAYS должен быть положительным числом.'
+    )
+
+PANTRY_INDEX_TTL = int(os.getenv('PANTRY_INDEX_TTL', 3600))
+
+REQUEST_INSTRUMENTATION = os.getenv('REQUEST_INSTRUMENTATION', 'True') == 'True'
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', 500))
+SLOW_REQUEST_SQL_LIMIT = int(os.getenv('SLOW_REQUEST_SQL_LIMIT', 20))
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 10))
+
+METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = os.getenv(
+    'METRICS_ALLOWED_IPS', '127.0.0.1,::1'
+).split(',')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.instrumentation': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
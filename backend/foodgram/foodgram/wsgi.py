@@ -10,7 +10,21 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/wsgi/
 import os
 
 from django.core.wsgi import get_wsgi_application
+from django.db import connections
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
 
 application = get_wsgi_application()
+
+from api.autocomplete import ingredient_index  # noqa: E402
+from api.pantry import pantry_index  # noqa: E402
+
+ingredient_index.warm()
+pantry_index.warm()
+
+# При GUNICORN_PRELOAD модуль выполняется в мастер-процессе до fork:
+# открытые при прогреве соединения не должны достаться воркерам.
+for connection in connections.all():
+    connection.close()
+    if hasattr(connection, 'close_pool'):
+        connection.close_pool()
@@ -0,0 +1,68 @@
+import glob
+import os
+import time
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+# По умолчанию один воркер, как и до переноса настроек в этот файл.
+# Каждый воркер держит до DB_POOL_MAX_SIZE соединений с пулом или по
+# одному на поток без него: workers * соединения на воркер не должно
+# превышать max_connections PostgreSQL. При нескольких воркерах нужен
+# общий кеш (CACHE_BACKEND), иначе on_starting выдаст предупреждение.
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+# При threads > 1 gunicorn сам переключает sync-воркеры на gthread.
+# Каждый поток держит своё соединение с БД, поэтому max_connections
+# PostgreSQL должен быть не меньше workers * threads.
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 2))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'False') == 'True'
+
+
+def on_starting(server):
+    """Проверяет кеш и очищает файлы метрик предыдущего запуска."""
+    check_cache_backend(server)
+    directory = os.getenv('METRICS_MULTIPROC_DIR')
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        os.remove(path)
+
+
+def check_cache_backend(server):
+    """Предупреждает о кеше в памяти процесса при нескольких воркерах.
+
+    Версии в кеше, которыми сбрасываются закешированные ответы и индексы
+    (см. api/cache.py), видны только своему процессу. Остальные воркеры
+    отдают устаревшие данные до истечения RECIPE_CACHE_TIMEOUT и TTL
+    индексов. Нужен общий кеш, см. CACHES в settings.py.
+    """
+    backend = os.getenv(
+        'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+    )
+    if server.cfg.workers > 1 and backend.endswith('LocMemCache'):
+        server.log.warning(
+            'CACHE_BACKEND=%s не разделяется между %s воркерами: '
+            'сброс кеша и индексов будет виден только одному из них. '
+            'Задайте общий кеш, например DatabaseCache или memcached.',
+            backend, server.cfg.workers,
+        )
+
+
+def child_exit(server, worker):
+    """Переименовывает файл метрик завершившегося воркера.
+
+    Новый воркер может получить тот же pid и затереть файл, а так его
+    счётчики перенесёт в aggregate.json ближайший сбор метрик.
+    """
+    directory = os.getenv('METRICS_MULTIPROC_DIR')
+    if not directory:
+        return
+    path = os.path.join(directory, f'{worker.pid}.json')
+    if os.path.exists(path):
+        os.replace(path, os.path.join(
+            directory, f'{worker.pid}.{time.time_ns()}.dead.json'
+        ))
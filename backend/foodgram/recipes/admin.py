@@ -1,7 +1,12 @@
 from django.contrib import admin
+from django.contrib.postgres.search import SearchQuery
+from django.db import connections
+from django.db.models import Q
 
-from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart, Tag)
+from .images import schedule_image_processing, schedule_variants_deletion
+from .models import (SEARCH_CONFIG, Favorite, Ingredient, Recipe,
+                     RecipeIngredient, ShoppingCart, ShoppingListItem, Tag,
+                     TimelineEntry)
 
 
 class IngredientInline(admin.TabularInline):
@@ -22,11 +27,51 @@ class RecipeAdmin(admin.ModelAdmin):
         'get_ingredients',
     )
     inlines = (IngredientInline,)
+    readonly_fields = (
+        'image_variants_ready', 'favorites_count', 'shopping_cart_count',
+        'score',
+    )
     list_display_links = ('name',)
     search_fields = ('name',)
     list_filter = ('author', 'name', 'tags', 'ingredients',)
     filter_horizontal = ('tags',)
     empty_value_display = '-пусто-'
+    list_select_related = ('author',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            'tags', 'ingredients'
+        )
+
+    def save_model(self, request, obj, form, change):
+        image_changed = 'image' in form.changed_data
+        if image_changed:
+            obj.image_variants_ready = False
+        super().save_model(request, obj, form, change)
+        if image_changed:
+            if change:
+                schedule_variants_deletion(form.initial['image'].name)
+            schedule_image_processing(obj)
+
+    def save_related(self, request, form, formsets, change):
+        recipe = form.instance
+        previous = list(recipe.recipe_ingredients.values_list(
+            'ingredient_id', flat=True
+        ))
+        super().save_related(request, form, formsets, change)
+        ShoppingListItem.objects.schedule_recipe_refresh(
+            recipe.pk, ingredients=previous
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or connections[queryset.db].vendor != 'postgresql':
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(
+            Q(search_vector=SearchQuery(search_term, config=SEARCH_CONFIG))
+            | Q(name__icontains=search_term)
+        ), False
 
 
 class IngredientAdmin(admin.ModelAdmin):
@@ -42,6 +87,26 @@ class TagAdmin(admin.ModelAdmin):
 class RecipeIngredientAdmin(admin.ModelAdmin):
     list_display = ('recipe', 'ingredient', 'amount',)
 
+    def save_model(self, request, obj, form, change):
+        previous = form.initial.get('ingredient')
+        super().save_model(request, obj, form, change)
+        ShoppingListItem.objects.schedule_recipe_refresh(
+            obj.recipe_id, ingredients=[previous] if previous else ()
+        )
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, RecipeIngredient.objects.filter(
+            pk=obj.pk
+        ))
+
+    def delete_queryset(self, request, queryset):
+        rows = list(queryset.values_list('recipe_id', 'ingredient_id'))
+        super().delete_queryset(request, queryset)
+        for recipe, ingredient in rows:
+            ShoppingListItem.objects.schedule_recipe_refresh(
+                recipe, ingredients=[ingredient]
+            )
+
 
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe',)
@@ -50,6 +115,37 @@ class FavoriteAdmin(admin.ModelAdmin):
 class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe',)
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        users = {obj.user_id, form.initial.get('user')} - {None}
+        recipes = {obj.recipe_id, form.initial.get('recipe')} - {None}
+        for recipe in recipes:
+            ShoppingListItem.objects.schedule_recipe_refresh(
+                recipe, users=users
+            )
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, ShoppingCart.objects.filter(
+            pk=obj.pk
+        ))
+
+    def delete_queryset(self, request, queryset):
+        rows = list(queryset.values_list('recipe_id', 'user_id'))
+        super().delete_queryset(request, queryset)
+        for recipe, user in rows:
+            ShoppingListItem.objects.schedule_recipe_refresh(
+                recipe, users=[user]
+            )
+
+
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = ('user', 'ingredient', 'amount',)
+
+
+class TimelineEntryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'recipe', 'pub_date',)
+    list_select_related = ('user', 'recipe',)
+
 
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(Ingredient, IngredientAdmin)
@@ -57,3 +153,5 @@ admin.site.register(Tag, TagAdmin)
 admin.site.register(RecipeIngredient, RecipeIngredientAdmin)
 admin.site.register(Favorite, FavoriteAdmin)
 admin.site.register(ShoppingCart, ShoppingCartAdmin)
+admin.site.register(ShoppingListItem, ShoppingListItemAdmin)
+admin.site.register(TimelineEntry, TimelineEntryAdmin)
@@ -0,0 +1,127 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+IMAGE_VARIANTS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'detail': (1200, 1200),
+}
+IMAGE_FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+VARIANTS_DIR = 'recipes/images/variants/'
+
+_executor = None
+
+
+def variant_name(image_name, variant, extension):
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return f'{VARIANTS_DIR}{stem}_{variant}.{extension}'
+
+
+def variant_names(image_name):
+    for variant in IMAGE_VARIANTS:
+        for extension in IMAGE_FORMATS:
+            yield variant_name(image_name, variant, extension)
+
+
+def render_variants(image_file):
+    """Возвращает {(вариант, расширение): байты} для исходного файла."""
+    with Image.open(image_file) as image:
+        image.draft('RGB', max(IMAGE_VARIANTS.values()))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        result = {}
+        for variant, size in IMAGE_VARIANTS.items():
+            resized = image.copy()
+            resized.thumbnail(size, Image.LANCZOS)
+            for extension, image_format in IMAGE_FORMATS.items():
+                buffer = BytesIO()
+                resized.save(buffer, image_format, quality=80)
+                result[variant, extension] = buffer.getvalue()
+        return result
+
+
+def process_recipe_image(recipe_id):
+    """Создаёт уменьшенные копии картинки рецепта."""
+    from .models import Recipe
+
+    recipe = Recipe.objects.filter(pk=recipe_id).only('image').first()
+    if recipe is None or not recipe.image:
+        return
+    image_name = recipe.image.name
+    with default_storage.open(image_name) as image_file:
+        variants = render_variants(image_file)
+    for (variant, extension), content in variants.items():
+        name = variant_name(image_name, variant, extension)
+        default_storage.delete(name)
+        default_storage.save(name, ContentFile(content))
+    recipe.refresh_from_db(fields=['image'])
+    if recipe.image.name == image_name:
+        recipe.image_variants_ready = True
+        recipe.save(update_fields=['image_variants_ready', 'updated'])
+    else:
+        # Картинку заменили, пока копии создавались.
+        delete_variants(image_name)
+
+
+def delete_variants(image_name):
+    """Удаляет уменьшенные копии картинки, которой больше нет у рецептов."""
+    from .models import Recipe
+
+    if Recipe.objects.filter(image=image_name).exists():
+        return
+    for name in variant_names(image_name):
+        default_storage.delete(name)
+
+
+def sync_backend(func, *args):
+    func(*args)
+
+
+def _run_in_thread(func, *args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Ошибка фоновой обработки %s%s', func.__name__, args)
+    finally:
+        connections.close_all()
+
+
+def thread_pool_backend(func, *args):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS,
+            thread_name_prefix='recipe-images',
+        )
+    _executor.submit(_run_in_thread, func, *args)
+
+
+def schedule_image_processing(recipe):
+    """Ставит обработку картинки в очередь после фиксации транзакции."""
+    enqueue = import_string(settings.IMAGE_PROCESSING_BACKEND)
+    transaction.on_commit(
+        lambda: enqueue(process_recipe_image, recipe.id)
+    )
+
+
+def schedule_variants_deletion(image_name):
+    """Удаляет копии заменённой или удалённой картинки после фиксации."""
+    if not image_name:
+        return
+    enqueue = import_string(settings.IMAGE_PROCESSING_BACKEND)
+    transaction.on_commit(
+        lambda: enqueue(delete_variants, image_name)
+    )
@@ -1,20 +1,100 @@
+import csv
 import json
 import os
+import time
+from itertools import islice
 
 from django.conf import settings
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
 
 from recipes.models import Ingredient
+from recipes.signals import ingredients_imported
+
+READ_SIZE = 64 * 1024
+DEFAULT_PATH = os.path.join(settings.BASE_DIR, 'data', 'ingredients.json')
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield row[0], row[1]
+
+
+def read_json(file):
+    """Построчно разбирает JSON-массив, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(READ_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидается JSON-массив ингредиентов.')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,')
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(READ_SIZE)
+            if not chunk:
+                raise CommandError('Некорректный JSON.')
+            buffer += chunk
+            continue
+        yield item['name'], item['measurement_unit']
+        buffer = buffer[end:]
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
 
 
 class Command(BaseCommand):
+    help = 'Импортирует ингредиенты из CSV или JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=DEFAULT_PATH)
+        parser.add_argument(
+            '--format',
+            choices=READERS,
+            help='По умолчанию определяется по расширению файла.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
     def handle(self, *args, **options):
-        with open(os.path.join(settings.BASE_DIR, 'data', 'ingredients.json'),
-                  'r', encoding='utf-8') as ingredients_data_file:
-            data = json.load(ingredients_data_file)
-            for i in range(len(data)):
-                Ingredient.objects.get_or_create(
-                    name=data[i].get('name'),
-                    measurement_unit=data[i].get('measurement_unit')
-                )
-            print('Импорт выполнен.')
+        path = options['path']
+        file_format = (
+            options['format'] or os.path.splitext(path)[1].lstrip('.')
+        )
+        if file_format not in READERS:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+
+        started = time.monotonic()
+        processed = 0
+        count_before = Ingredient.objects.count()
+        with open(path, 'r', encoding='utf-8') as ingredients_data_file:
+            rows = READERS[file_format](ingredients_data_file)
+            with transaction.atomic():
+                while True:
+                    batch = [
+                        Ingredient(name=name, measurement_unit=unit)
+                        for name, unit in islice(rows, options['batch_size'])
+                    ]
+                    if not batch:
+                        break
+                    Ingredient.objects.bulk_create(
+                        batch, ignore_conflicts=True
+                    )
+                    processed += len(batch)
+                    elapsed = max(time.monotonic() - started, 0.001)
+                    self.stdout.write(
+                        f'Обработано {processed} строк, '
+                        f'{processed / elapsed:.0f} строк/с'
+                    )
+                ingredients_imported.send(sender=Ingredient)
+        created = Ingredient.objects.count() - count_before
+        self.stdout.write(
+            f'Импорт выполнен: добавлено {created} из {processed} '
+            f'за {time.monotonic() - started:.1f} с.'
+        )
@@ -0,0 +1,29 @@
+from django.core.management import BaseCommand
+
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии картинок рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересоздать копии и для уже обработанных рецептов.',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.all()
+        if not options['all']:
+            recipes = recipes.filter(image_variants_ready=False)
+        ids = list(recipes.values_list('id', flat=True))
+        for number, recipe_id in enumerate(ids, 1):
+            try:
+                process_recipe_image(recipe_id)
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'Рецепт {recipe_id}: {error}')
+            if number % 100 == 0:
+                self.stdout.write(f'Обработано {number} из {len(ids)}')
+        self.stdout.write(f'Готово: {len(ids)} рецептов.')
@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription
+
+User = get_user_model()
+
+COUNTERS = (
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscription, 'author'),
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'shopping_cart_count', ShoppingCart, 'recipe'),
+)
+
+
+def count_of(model, field):
+    """Подзапрос с числом строк model, ссылающихся на внешний объект."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                total=Count('pk')
+            ).values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить согласованность, не изменяя данные.',
+        )
+
+    def handle(self, *args, **options):
+        mismatched = 0
+        for model, counter, source, field in COUNTERS:
+            if not options['check']:
+                model.objects.update(**{counter: count_of(source, field)})
+                continue
+            stale = model.objects.annotate(
+                actual=count_of(source, field)
+            ).exclude(**{counter: F('actual')}).values_list(
+                'pk', counter, 'actual'
+            )
+            for pk, stored, actual in stale:
+                mismatched += 1
+                if mismatched <= 20:
+                    self.stdout.write(
+                        f'{model.__name__} {pk}, {counter}: '
+                        f'ожидается {actual}, сохранено {stored}'
+                    )
+        if mismatched:
+            raise CommandError(
+                f'Найдено расхождений: {mismatched}. '
+                'Запустите команду без --check.'
+            )
+        self.stdout.write(
+            'Счётчики согласованы.' if options['check']
+            else 'Счётчики пересчитаны.'
+        )
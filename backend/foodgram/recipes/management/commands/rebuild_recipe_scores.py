@@ -0,0 +1,14 @@
+from django.core.management import BaseCommand
+
+from recipes.ranking import rebuild_scores
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает популярность рецептов по избранному и корзинам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        updated = rebuild_scores(options['batch_size'])
+        self.stdout.write(f'Популярность пересчитана для {updated} рецептов.')
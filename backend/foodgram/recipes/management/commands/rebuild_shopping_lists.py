@@ -0,0 +1,49 @@
+from django.core.management import BaseCommand, CommandError
+
+from recipes.models import ShoppingListItem
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные списки покупок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить согласованность, не изменяя данные.',
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            ShoppingListItem.objects.rebuild()
+            self.stdout.write('Списки покупок пересобраны.')
+            return
+
+        expected = {
+            (user, ingredient): amount
+            for user, ingredient, amount
+            in ShoppingListItem.objects.expected()
+        }
+        stored = {
+            (user, ingredient): amount
+            for user, ingredient, amount
+            in ShoppingListItem.objects.values_list(
+                'user_id', 'ingredient_id', 'amount'
+            )
+        }
+        mismatched = [
+            key for key in expected.keys() | stored.keys()
+            if expected.get(key) != stored.get(key)
+        ]
+        for user, ingredient in mismatched[:20]:
+            self.stdout.write(
+                f'Пользователь {user}, ингредиент {ingredient}: '
+                f'ожидается {expected.get((user, ingredient))}, '
+                f'сохранено {stored.get((user, ingredient))}'
+            )
+        if mismatched:
+            raise CommandError(
+                f'Найдено расхождений: {len(mismatched)}. '
+                'Запустите команду без --check.'
+            )
+        self.stdout.write('Списки покупок согласованы.')
@@ -0,0 +1,13 @@
+from django.core.management import BaseCommand
+
+from recipes.models import TimelineEntry
+
+
+class Command(BaseCommand):
+    help = 'Заново заполняет ленты подписок пользователей.'
+
+    def handle(self, *args, **options):
+        TimelineEntry.objects.rebuild()
+        self.stdout.write(
+            f'Ленты пересобраны, записей: {TimelineEntry.objects.count()}.'
+        )
@@ -0,0 +1,53 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+INDEXES = (
+    (
+        'recipes_ingredient_name_upper_idx',
+        'recipes_ingredient',
+        'btree (UPPER("name"::text) text_pattern_ops)',
+    ),
+    (
+        'recipes_ingredient_name_trgm_idx',
+        'recipes_ingredient',
+        'gin (UPPER("name"::text) gin_trgm_ops)',
+    ),
+    (
+        'recipes_recipe_name_upper_idx',
+        'recipes_recipe',
+        'btree (UPPER("name"::text) text_pattern_ops)',
+    ),
+    (
+        'recipes_recipe_name_trgm_idx',
+        'recipes_recipe',
+        'gin (UPPER("name"::text) gin_trgm_ops)',
+    ),
+)
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, definition in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING {definition}'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_shoppinglistitem'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
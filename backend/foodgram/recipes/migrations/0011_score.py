@@ -0,0 +1,65 @@
+# Generated by Django 2.2.19 on 2026-10-18 06:40
+
+import math
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def fill_scores(apps, schema_editor):
+    # Все прошлые действия получают created в момент миграции.
+    # score - логарифм суммы вкладов, см. recipes.ranking.
+    Recipe = apps.get_model('recipes', 'Recipe')
+    epoch = datetime(2021, 1, 1, tzinfo=django.utils.timezone.utc)
+    half_life = settings.RECIPE_SCORE_HALF_LIFE_DAYS * 24 * 60 * 60
+    contributions = defaultdict(list)
+    for name, weight in (('Favorite', 1.0), ('ShoppingCart', 2.0)):
+        rows = apps.get_model('recipes', name).objects.values_list(
+            'recipe_id', 'created'
+        )
+        for recipe, created in rows.iterator():
+            elapsed = (created - epoch).total_seconds()
+            contributions[recipe].append(
+                math.log(weight) + elapsed / half_life * math.log(2)
+            )
+    updated = []
+    for pk, values in contributions.items():
+        top = max(values)
+        score = top + math.log(sum(math.exp(value - top) for value in values))
+        updated.append(Recipe(pk=pk, score=score))
+    Recipe.objects.bulk_update(updated, ['score'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='score',
+            field=models.FloatField(default=-1.7976931348623157e+308, editable=False, verbose_name='Популярность'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-score', '-pub_date', '-id'], name='recipe_score_idx'),
+        ),
+        migrations.RunPython(fill_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 2.2.19 on 2026-10-18 06:25
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('russian', coalesce({row}name, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce({row}text, '')), 'B')"
+)
+
+
+def create_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f"""
+        CREATE OR REPLACE FUNCTION recipes_recipe_search_vector_update()
+        RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {SEARCH_VECTOR.format(row='NEW.')};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    schema_editor.execute("""
+        CREATE TRIGGER recipes_recipe_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+        FOR EACH ROW EXECUTE PROCEDURE recipes_recipe_search_vector_update()
+    """)
+    schema_editor.execute(
+        'UPDATE recipes_recipe SET search_vector = '
+        + SEARCH_VECTOR.format(row='')
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS recipes_recipe_search_vector_idx '
+        'ON recipes_recipe USING gin (search_vector)'
+    )
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'DROP TRIGGER IF EXISTS recipes_recipe_search_vector_trigger '
+        'ON recipes_recipe'
+    )
+    schema_editor.execute(
+        'DROP FUNCTION IF EXISTS recipes_recipe_search_vector_update()'
+    )
+    schema_editor.execute(
+        'DROP INDEX IF EXISTS recipes_recipe_search_vector_idx'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
@@ -1,9 +1,24 @@
+import heapq
+import sys
+import threading
+from collections import defaultdict
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, RegexValidator
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import (BooleanField, Exists, F, OuterRef, Q, Sum,
+                              Value, Window)
+from django.db.models.functions import RowNumber
+
+from users.models import DenormalizedFieldsMixin, Subscription
 
 MIN_AMOUNT = 1
 MIN_COOKING_TIME = 1
+SEARCH_CONFIG = 'russian'
+# Наименьшее конечное значение float: у рецепта нет действий (см. ranking).
+NO_SCORE = -sys.float_info.max
 
 User = get_user_model()
 
@@ -18,6 +33,10 @@ class Ingredient(models.Model):
         max_length=200,
         verbose_name='Единица измерения'
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
 
     class Meta:
         ordering = ('name',)
@@ -58,6 +77,10 @@ class Tag(models.Model):
         unique=True,
         verbose_name='Слаг'
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
 
     class Meta:
         verbose_name = 'Тег'
@@ -71,7 +94,64 @@ class Tag(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    """Запросы рецептов с заранее загруженными связями."""
+
+    def with_related(self):
+        return self.select_related('author').prefetch_related(
+            'tags',
+            'recipe_ingredients__ingredient',
+        )
+
+    def with_user_flags(self, user):
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+        )
+
+    def latest_by_author(self, author_ids, limit=None):
+        """Последние limit рецептов каждого автора одним запросом.
+
+        Возвращает {author_id: [рецепты]}. Django не умеет фильтровать
+        по оконной функции, поэтому выборка с ROW_NUMBER() оборачивается
+        во внешний SELECT.
+        """
+        recipes = self.filter(author_id__in=author_ids)
+        if limit is None:
+            rows = recipes.order_by('author_id', '-pub_date', '-id')
+        else:
+            ranked = recipes.annotate(
+                position=Window(
+                    expression=RowNumber(),
+                    partition_by=[F('author_id')],
+                    order_by=[F('pub_date').desc(), F('id').desc()],
+                )
+            ).order_by()
+            sql, params = ranked.query.sql_with_params()
+            position = connections[self.db].ops.quote_name('position')
+            rows = self.raw(
+                f'SELECT * FROM ({sql}) ranked '
+                f'WHERE ranked.{position} <= %s '
+                f'ORDER BY ranked.author_id, ranked.{position}',
+                (*params, limit),
+                using=self.db,
+            )
+        result = defaultdict(list)
+        for recipe in rows:
+            result[recipe.author_id].append(recipe)
+        return result
+
+
+class Recipe(DenormalizedFieldsMixin, models.Model):
     """Модель рецептов."""
     name = models.CharField(
         max_length=200,
@@ -87,6 +167,31 @@ class Recipe(models.Model):
         upload_to='recipes/images/',
         verbose_name='Картинка'
     )
+    image_variants_ready = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Уменьшенные копии готовы'
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В корзинах'
+    )
+    score = models.FloatField(
+        default=NO_SCORE,
+        editable=False,
+        verbose_name='Популярность'
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
+    )
     text = models.TextField(
         help_text='Описание рецепта',
         verbose_name='Описание рецепта'
@@ -103,6 +208,10 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
     tags = models.ManyToManyField(
         Tag,
         verbose_name='Теги',
@@ -115,10 +224,35 @@ class Recipe(models.Model):
         verbose_name='Ингридиенты'
     )
 
+    objects = RecipeQuerySet.as_manager()
+
+    denormalized_fields = (
+        'image_variants_ready', 'favorites_count', 'shopping_cart_count',
+        'score', 'search_vector',
+    )
+
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['-favorites_count', '-pub_date', '-id'],
+                name='recipe_favorites_count_idx'
+            ),
+            models.Index(
+                fields=['-score', '-pub_date', '-id'],
+                name='recipe_score_idx'
+            ),
+        ]
 
     def get_tags(self):
         return "\n".join([i.name for i in self.tags.all()])
@@ -157,6 +291,12 @@ class RecipeIngredient(models.Model):
                 name='recipe_ingredient',
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'ingredient', 'amount'],
+                name='recipe_ingredient_amount_idx',
+            ),
+        ]
 
     def __str__(self) -> str:
         return f'{self.ingredient}'
@@ -176,6 +316,10 @@ class Favorite(models.Model):
         related_name='favorites',
         verbose_name='Рецепт',
     )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата добавления',
+    )
 
     class Meta:
         verbose_name = 'Избранное'
@@ -205,6 +349,10 @@ class ShoppingCart(models.Model):
         related_name='shopping_cart',
         verbose_name='Рецепт',
     )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата добавления',
+    )
 
     class Meta:
         verbose_name = 'Корзина'
@@ -220,6 +368,289 @@ class ShoppingCart(models.Model):
         return f'"{self.recipe}" добавлен в Корзину покупок'
 
 
+# Пары (пользователи, ингредиенты), ждущие пересчёта в текущем потоке.
+pending_refresh = threading.local()
+
+
+class ShoppingListItemQuerySet(models.QuerySet):
+    """Запросы к материализованному списку покупок."""
+
+    def refresh(self, users, ingredients):
+        """Пересчитывает суммы для пар (пользователь, ингредиент).
+
+        users и ingredients - списки id или подзапросы, возвращающие id.
+        """
+        with transaction.atomic():
+            list(User.objects.select_for_update().filter(
+                pk__in=users
+            ).order_by('pk').values_list('pk', flat=True))
+            totals = RecipeIngredient.objects.filter(
+                recipe__shopping_cart__user__in=users,
+                ingredient__in=ingredients,
+            ).values_list(
+                'recipe__shopping_cart__user', 'ingredient',
+            ).annotate(
+                total=Sum('amount'),
+            )
+            self.filter(user__in=users, ingredient__in=ingredients).delete()
+            self.bulk_create(
+                self.model(user_id=user, ingredient_id=ingredient,
+                           amount=amount)
+                for user, ingredient, amount in totals
+            )
+
+    def schedule_refresh(self, users, ingredients):
+        """Пересчитывает пары после фиксации транзакции.
+
+        Пары всех изменений транзакции копятся и пересчитываются одним
+        проходом в первом сработавшем on_commit, остальные ничего не
+        делают. Пары из откаченной транзакции попадут в следующий
+        пересчёт, это безопасно: суммы считаются заново.
+        """
+        pending = getattr(pending_refresh, 'pairs', None)
+        if pending is None:
+            pending = pending_refresh.pairs = (set(), set())
+        pending[0].update(users)
+        pending[1].update(ingredients)
+        transaction.on_commit(self.flush_refresh)
+
+    def schedule_recipe_refresh(self, recipe_id, users=None, ingredients=()):
+        """Пересчитывает ингредиенты рецепта после фиксации транзакции.
+
+        По умолчанию - для всех пользователей, у которых рецепт в
+        корзине. ingredients - дополнительные ингредиенты, например
+        удалённые из рецепта.
+        """
+        if users is None:
+            users = ShoppingCart.objects.filter(
+                recipe_id=recipe_id
+            ).values_list('user_id', flat=True)
+        users = list(users)
+        if not users:
+            return
+        self.schedule_refresh(users, [
+            *RecipeIngredient.objects.filter(
+                recipe_id=recipe_id
+            ).values_list('ingredient_id', flat=True),
+            *ingredients,
+        ])
+
+    def flush_refresh(self, batch_size=500):
+        users, ingredients = getattr(pending_refresh, 'pairs', None) or (
+            (), ()
+        )
+        pending_refresh.pairs = None
+        if not ingredients:
+            return
+        users = sorted(users)
+        ingredients = sorted(ingredients)
+        for offset in range(0, len(users), batch_size):
+            self.refresh(users[offset:offset + batch_size], ingredients)
+
+    def rebuild(self):
+        """Полностью пересобирает список покупок всех пользователей."""
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(
+                self.model(user_id=user, ingredient_id=ingredient,
+                           amount=amount)
+                for user, ingredient, amount in self.expected()
+            )
+
+    @staticmethod
+    def expected():
+        """Суммы, рассчитанные заново по корзинам пользователей."""
+        return RecipeIngredient.objects.filter(
+            recipe__shopping_cart__isnull=False,
+        ).values_list(
+            'recipe__shopping_cart__user', 'ingredient',
+        ).annotate(
+            total=Sum('amount'),
+        ).order_by()
+
+
+class ShoppingListItem(models.Model):
+    """Модель суммарного количества ингредиента в корзине пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент',
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество',
+    )
+
+    objects = ShoppingListItemQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Список покупок'
+        verbose_name_plural = 'Списки покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='user_shopping_list_ingredient'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient}: {self.amount}'
+
+
+class TimelineEntryQuerySet(models.QuerySet):
+    """Запросы к ленте рецептов авторов, на которых подписан пользователь.
+
+    Новые рецепты записываются в ленты подписчиков при публикации.
+    Рецепты авторов, у которых подписчиков больше FEED_FANOUT_LIMIT,
+    в ленты не записываются и подмешиваются при чтении.
+    """
+
+    @staticmethod
+    def is_pulled(author):
+        return author.subscribers_count > settings.FEED_FANOUT_LIMIT
+
+    def push(self, recipe):
+        """Добавляет рецепт в ленты подписчиков автора."""
+        if self.is_pulled(recipe.author):
+            return
+        followers = list(recipe.author.following.values_list(
+            'user_id', flat=True
+        ))
+        self.bulk_create(
+            (
+                self.model(user_id=user, recipe_id=recipe.id,
+                           pub_date=recipe.pub_date)
+                for user in followers
+            ),
+            ignore_conflicts=True,
+        )
+        self.trim(followers)
+
+    def follow(self, user, author):
+        """Заполняет ленту последними рецептами нового автора."""
+        if self.is_pulled(author):
+            return
+        recipes = Recipe.objects.filter(author=author).values_list(
+            'id', 'pub_date'
+        )[:settings.FEED_SIZE]
+        self.bulk_create(
+            (
+                self.model(user_id=user.id, recipe_id=recipe,
+                           pub_date=pub_date)
+                for recipe, pub_date in recipes
+            ),
+            ignore_conflicts=True,
+        )
+        self.trim([user.id])
+
+    def unfollow(self, user, author):
+        self.filter(user=user, recipe__author=author).delete()
+
+    def trim(self, users):
+        """Оставляет в лентах users не больше FEED_SIZE записей."""
+        if not users:
+            return
+        ranked = self.filter(user__in=users).annotate(
+            position=Window(
+                expression=RowNumber(),
+                partition_by=[F('user_id')],
+                order_by=[F('pub_date').desc(), F('recipe_id').desc()],
+            )
+        ).order_by().values('id', 'position')
+        sql, params = ranked.query.sql_with_params()
+        quote_name = connections[self.db].ops.quote_name
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {quote_name(self.model._meta.db_table)} '
+                f'WHERE id IN (SELECT ranked.id FROM ({sql}) ranked '
+                f'WHERE ranked.{quote_name("position")} > %s)',
+                (*params, settings.FEED_SIZE),
+            )
+
+    def rebuild(self):
+        """Заново заполняет ленты всех пользователей по подпискам."""
+        with transaction.atomic():
+            self.all().delete()
+            subscriptions = Subscription.objects.select_related(
+                'user', 'author'
+            )
+            for subscription in subscriptions.iterator():
+                self.follow(subscription.user, subscription.author)
+
+    def read(self, user, limit, after=None):
+        """Id рецептов ленты в порядке (-pub_date, -id).
+
+        after - позиция (pub_date, id), после которой начинается выборка.
+        Каждый источник читается не более чем на limit строк.
+        """
+        def page(queryset, recipe_field):
+            if after is not None:
+                queryset = queryset.filter(
+                    Q(pub_date__lt=after[0])
+                    | Q(pub_date=after[0], **{f'{recipe_field}__lt': after[1]})
+                )
+            return queryset.order_by(
+                '-pub_date', f'-{recipe_field}'
+            ).values_list('pub_date', recipe_field)[:limit]
+
+        pushed = page(self.filter(user=user), 'recipe_id')
+        pulled = page(Recipe.objects.filter(
+            author__following__user=user,
+            author__subscribers_count__gt=settings.FEED_FANOUT_LIMIT,
+        ), 'id')
+        ids, seen = [], set()
+        for _, recipe in heapq.merge(pushed, pulled, reverse=True):
+            if recipe not in seen:
+                seen.add(recipe)
+                ids.append(recipe)
+        return ids[:limit]
+
+
+class TimelineEntry(models.Model):
+    """Модель записи в ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Пользователь',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Рецепт',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+
+    objects = TimelineEntryQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='user_timeline_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='timeline_user_pub_date_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.recipe_id}'
+
+
 class RecipeTag(models.Model):
     """Модель связывающая теги и рецепты."""
     recipe = models.ForeignKey(
@@ -0,0 +1,92 @@
+"""Популярность рецептов с затуханием по времени.
+
+Каждое добавление рецепта в избранное или корзину прибавляет к
+популярности вес действия, умноженный на 2 ** ((t - SCORE_EPOCH) / T),
+где T - период полураспада RECIPE_SCORE_HALF_LIFE_DAYS. Относительный
+вклад старых действий убывает вдвое за каждый период, поэтому счёт
+достаточно обновлять при записи, а сортировка по нему идёт по индексу.
+
+Сама сумма растёт без ограничения, поэтому в Recipe.score хранится её
+натуральный логарифм: он растёт линейно со временем и не переполняет
+float. Сложение и вычитание вкладов выполняются в БД через log-sum-exp.
+Отсутствие действий обозначает NO_SCORE - наименьшее конечное float,
+заменяющее логарифм пустой суммы. Любое другое значение, в том числе
+отрицательное, - настоящая популярность, а при сортировке по убыванию
+NO_SCORE последний.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils import timezone
+
+from .models import NO_SCORE, Favorite, Recipe, ShoppingCart
+
+SCORE_EPOCH = datetime(2021, 1, 1, tzinfo=timezone.utc)
+SCORE_WEIGHTS = {
+    Favorite: 1.0,
+    ShoppingCart: 2.0,
+}
+# Если после вычитания остаётся меньше этой доли (в логарифме) от
+# убранного вклада, остаток считается погрешностью и счёт сбрасывается.
+SCORE_TOLERANCE = 1e-6
+
+
+def activity_score(model, moment):
+    """Логарифм вклада действия model, совершённого в момент moment."""
+    half_life = settings.RECIPE_SCORE_HALF_LIFE_DAYS * 24 * 60 * 60
+    elapsed = (moment - SCORE_EPOCH).total_seconds()
+    return math.log(SCORE_WEIGHTS[model]) + elapsed / half_life * math.log(2)
+
+
+def log_sum(values):
+    """Логарифм суммы exp(value) без переполнения."""
+    top = max(values)
+    return top + math.log(sum(math.exp(value - top) for value in values))
+
+
+def add_score(value):
+    """Выражение для score после прибавления вклада с логарифмом value."""
+    score = F('score')
+    value = Value(value)
+    return Case(
+        When(score=NO_SCORE, then=value),
+        default=Greatest(score, value) + Ln(
+            Value(1.0) + Exp(-Abs(score - value))
+        ),
+        output_field=FloatField(),
+    )
+
+
+def subtract_score(value):
+    """Выражение для score после вычитания вклада с логарифмом value."""
+    score = F('score')
+    return Case(
+        When(score__lte=value + SCORE_TOLERANCE, then=Value(NO_SCORE)),
+        default=score + Ln(Value(1.0) - Exp(Value(value) - score)),
+        output_field=FloatField(),
+    )
+
+
+def rebuild_scores(batch_size=1000):
+    """Пересчитывает популярность всех рецептов по истории действий."""
+    contributions = defaultdict(list)
+    for model in SCORE_WEIGHTS:
+        rows = model.objects.values_list('recipe_id', 'created')
+        for recipe, created in rows.iterator():
+            contributions[recipe].append(activity_score(model, created))
+    with transaction.atomic():
+        Recipe.objects.exclude(score=NO_SCORE).update(score=NO_SCORE)
+        Recipe.objects.bulk_update(
+            [
+                Recipe(pk=pk, score=log_sum(values))
+                for pk, values in contributions.items()
+            ],
+            ['score'],
+            batch_size=batch_size,
+        )
+    return len(contributions)
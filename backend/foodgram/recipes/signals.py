@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+
+from .images import schedule_variants_deletion
+from .models import (Favorite, Recipe, ShoppingCart, ShoppingListItem,
+                     TimelineEntry)
+from .ranking import activity_score, add_score, subtract_score
+
+User = get_user_model()
+
+# Массовый импорт ингредиентов: bulk_create не отправляет post_save.
+ingredients_imported = Signal()
+
+COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'shopping_cart_count',
+}
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(instance, created, **kwargs):
+    if created:
+        User.objects.filter(pk=instance.author_id).update(
+            recipes_count=F('recipes_count') + 1
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def push_to_timelines(instance, created, **kwargs):
+    if created:
+        transaction.on_commit(
+            lambda: TimelineEntry.objects.push(instance)
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(instance, **kwargs):
+    User.objects.filter(pk=instance.author_id, recipes_count__gt=0).update(
+        recipes_count=F('recipes_count') - 1
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_image_variants(instance, **kwargs):
+    schedule_variants_deletion(instance.image.name)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def increment_recipe_counter(sender, instance, created, **kwargs):
+    if created:
+        field = COUNTERS[sender]
+        Recipe.objects.filter(pk=instance.recipe_id).update(
+            score=add_score(activity_score(sender, instance.created)),
+            **{field: F(field) + 1},
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_recipe_counter(sender, instance, **kwargs):
+    field = COUNTERS[sender]
+    Recipe.objects.filter(
+        pk=instance.recipe_id, **{f'{field}__gt': 0}
+    ).update(
+        score=subtract_score(activity_score(sender, instance.created)),
+        **{field: F(field) - 1},
+    )
+
+
+@receiver(pre_delete, sender=Recipe)
+def refresh_list_on_recipe_delete(instance, **kwargs):
+    # pre_delete: к post_delete корзины и ингредиенты рецепта уже
+    # удалены каскадом. Остальные изменения корзин и ингредиентов
+    # пересчитывают списки явно: в представлениях, сериализаторе
+    # рецепта и админке.
+    ShoppingListItem.objects.schedule_recipe_refresh(instance.pk)
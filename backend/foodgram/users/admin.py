@@ -6,6 +6,7 @@ from .models import Subscription, User
 
 class UserAdmin(admin.ModelAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name',)
+    readonly_fields = ('recipes_count', 'subscribers_count',)
     search_fields = ('username', 'role',)
     list_filter = ('username', 'email',)
     ordering = ('username',)
@@ -16,7 +16,31 @@ class UserRole:
     )
 
 
-class User(AbstractUser):
+class DenormalizedFieldsMixin:
+    """Не даёт полному save() перезаписать поля denormalized_fields.
+
+    Эти поля меняются только выражениями F() в сигналах, а значения в
+    загруженном ранее экземпляре могут устареть. Для существующей
+    записи save() без update_fields сохраняет все поля, кроме них.
+    """
+    denormalized_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not args
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.denormalized_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(DenormalizedFieldsMixin, AbstractUser):
     """Модель пользователя."""
     email = models.EmailField(
         max_length=254,
@@ -43,6 +67,18 @@ class User(AbstractUser):
         max_length=150,
         verbose_name='Пароль',
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов'
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков'
+    )
+
+    denormalized_fields = ('recipes_count', 'subscribers_count')
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = (
@@ -91,6 +127,16 @@ class Subscription(models.Model):
                 name='unique_following'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['user', 'id'],
+                name='subscription_user_id_idx',
+            ),
+            models.Index(
+                fields=['author', 'user'],
+                name='subscription_author_user_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user} подписался на {self.author}'
@@ -12,11 +12,21 @@ from djoser.views import UserViewSet
 from api.pagination import CustomPagination
 from api.serializers import CustomUserSerializer, SubscriptionSerializer
 
+from recipes.models import Recipe
+
 from .models import Subscription
 
 User = get_user_model()
 
 
+def get_recipes_limit(request):
+    """Значение ?recipes_limit=, если это положительное число."""
+    recipes_limit = request.query_params.get('recipes_limit', '')
+    if recipes_limit.isdigit() and int(recipes_limit) > 0:
+        return int(recipes_limit)
+    return None
+
+
 class CustomUserViewSet(UserViewSet):
     """Вьюсет пользователей."""
     queryset = User.objects.all()
@@ -24,6 +34,7 @@ class CustomUserViewSet(UserViewSet):
     pagination_class = CustomPagination
     permission_classes = (AllowAny, )
     http_method_names = ('get', 'post', 'head', 'delete')
+    keyset_ordering = ('id',)
 
     def create(self, request, *args, **kwargs):
         password = request.data.get('password')
@@ -60,7 +71,10 @@ class CustomUserViewSet(UserViewSet):
             serializer = SubscriptionSerializer(
                 subscription,
                 data=request.data,
-                context={'request': request}
+                context={
+                    'request': request,
+                    'recipes_limit': get_recipes_limit(request),
+                }
             )
             serializer.is_valid(raise_exception=True)
             return Response(
@@ -81,12 +95,22 @@ class CustomUserViewSet(UserViewSet):
         serializer_class=SubscriptionSerializer
     )
     def subscriptions(self, request):
-        queryset = Subscription.objects.filter(user=request.user)
-        recipes_limit = request.query_params.get('recipes_limit')
+        queryset = Subscription.objects.filter(
+            user=request.user
+        ).select_related('author').order_by('id')
+        recipes_limit = get_recipes_limit(request)
         pages = self.paginate_queryset(queryset)
+        recipes_by_author = Recipe.objects.latest_by_author(
+            [subscription.author_id for subscription in pages],
+            recipes_limit,
+        )
         serializer = SubscriptionSerializer(
             pages,
             many=True,
-            context={'request': request, 'recipes_limit': recipes_limit}
+            context={
+                'request': request,
+                'recipes_limit': recipes_limit,
+                'recipes_by_author': recipes_by_author,
+            }
         )
         return self.get_paginated_response(serializer.data)